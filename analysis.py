@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""跨传感器相关性与过热事件分析
+
+- 相关性：基于预聚合表（storage.ROLLUP_SCHEMA）把各传感器的平均温度对齐到相同的时间桶上，
+  计算每对传感器在 ±max_lag 个时间桶内的滞后相关系数
+- 过热事件：连续超过阈值的时间段，包括峰值、持续时间与超阈面积（°C·秒）。先用原生
+  ROLLUP_SECONDS 粒度的每桶最高温度定位可能超阈的时间段，再用其中的原始读数精确计算，
+  结果与分析所用的时间桶大小无关
+"""
+import math
+from itertools import combinations
+from operator import mul
+
+from storage import ROLLUP_SECONDS, SQLiteBackend, format_naive_epoch, naive_epoch
+from temperature_collector import TEMPERATURE_THRESHOLDS, get_temperature_threshold
+
+# 自动选择时间桶时，每个传感器序列的最大点数
+ANALYSIS_MAX_POINTS = 1440
+
+# 默认最大滞后（时间桶个数）；计算量与滞后个数成正比，请求值不超过 ANALYSIS_MAX_LAG_LIMIT
+ANALYSIS_MAX_LAG = 6
+ANALYSIS_MAX_LAG_LIMIT = 60
+
+# 单次分析的最长时间范围（小时）
+ANALYSIS_MAX_HOURS = 366 * 24
+
+def choose_bucket_seconds(window_seconds, requested=None):
+    """时间桶必须是预聚合粒度的整数倍；未指定时按 ANALYSIS_MAX_POINTS 自动选择"""
+    seconds = requested or window_seconds / ANALYSIS_MAX_POINTS
+    return max(1, math.ceil(seconds / ROLLUP_SECONDS)) * ROLLUP_SECONDS
+
+def load_aligned_series(db_path, start, end, bucket_seconds, sensors=None):
+    """返回 (首个时间桶, 桶数, {传感器: 平均温度列表})，缺失的桶为 None"""
+    first = naive_epoch(start) // bucket_seconds * bucket_seconds
+    count = (naive_epoch(end) - first + bucket_seconds - 1) // bucket_seconds
+
+    series = {}
+    for slot, sensor_name, mean, peak in SQLiteBackend(db_path).query_rollups(start, end, bucket_seconds, sensors):
+        values = series.get(sensor_name)
+        if values is None:
+            values = series[sensor_name] = [None] * count
+        index = (slot - first) // bucket_seconds
+        if 0 <= index < count:
+            values[index] = mean
+    return first, count, series
+
+def standardize(values):
+    """z-score标准化，缺失值填0（即序列均值）；方差为0时返回 None"""
+    present = [v for v in values if v is not None]
+    if len(present) < 2:
+        return None
+    mean = math.fsum(present) / len(present)
+    std = math.sqrt(math.fsum((v - mean) ** 2 for v in present) / len(present))
+    if std == 0:
+        return None
+    return [(v - mean) / std if v is not None else 0.0 for v in values]
+
+def lagged_correlation(za, zb, lag):
+    """lag > 0 表示 b 滞后于 a"""
+    if lag >= 0:
+        a, b = za[:len(za) - lag], zb[lag:]
+    else:
+        a, b = za[-lag:], zb[:len(zb) + lag]
+    if not a:
+        return None
+    return sum(map(mul, a, b)) / len(a)
+
+def correlate_series(names, standardized, max_lag, bucket_seconds):
+    """计算每对传感器的零滞后相关系数与最佳滞后"""
+    pairs = []
+    matrix = [[1.0 if i == j else None for j in range(len(names))] for i in range(len(names))]
+
+    for i, j in combinations(range(len(names)), 2):
+        za, zb = standardized[i], standardized[j]
+        if za is None or zb is None:
+            continue
+        by_lag = {lag: lagged_correlation(za, zb, lag) for lag in range(-max_lag, max_lag + 1)}
+        best_lag = max((lag for lag in by_lag if by_lag[lag] is not None), key=lambda lag: by_lag[lag])
+        matrix[i][j] = matrix[j][i] = by_lag[0]
+        pairs.append({
+            'sensor_a': names[i],
+            'sensor_b': names[j],
+            'r': by_lag[0],
+            'best_lag_seconds': best_lag * bucket_seconds,
+            'best_r': by_lag[best_lag]
+        })
+
+    pairs.sort(key=lambda pair: -pair['best_r'])
+    return pairs, matrix
+
+def merge_slots(slots):
+    """把升序的原生时间桶合并为连续区间 [(起, 止)]"""
+    ranges = []
+    for slot in slots:
+        if ranges and ranges[-1][1] == slot:
+            ranges[-1][1] = slot + ROLLUP_SECONDS
+        else:
+            ranges.append([slot, slot + ROLLUP_SECONDS])
+    return ranges
+
+def events_from_readings(sensor_name, rows, threshold):
+    """在按时间排序的原始读数中查找连续超过阈值的时间段
+
+    事件从第一条超阈读数开始，到第一条回落到阈值及以下的读数结束（数据在超阈状态结束时取最后一条读数）。
+    超阈面积按矩形法累加：每条超阈读数乘以到下一条读数的间隔，间隔最长按 ROLLUP_SECONDS 计，
+    避免采集中断被计为持续过热。
+    """
+    events = []
+    current = None
+
+    def close(timestamp):
+        duration = naive_epoch(timestamp) - naive_epoch(current['start'])
+        events.append(dict(current, end=timestamp, duration_seconds=duration))
+
+    for index, row in enumerate(rows):
+        temperature = row['temperature']
+        if temperature > threshold:
+            if current is None:
+                current = {'sensor_name': sensor_name, 'threshold': threshold, 'start': row['timestamp'],
+                           'peak': temperature, 'area': 0.0}
+            current['peak'] = max(current['peak'], temperature)
+            if index + 1 < len(rows):
+                interval = naive_epoch(rows[index + 1]['timestamp']) - naive_epoch(row['timestamp'])
+                current['area'] += (temperature - threshold) * min(interval, ROLLUP_SECONDS)
+        elif current is not None:
+            close(row['timestamp'])
+            current = None
+
+    if current is not None:
+        close(rows[-1]['timestamp'])
+    return events
+
+def detect_heat_events(db_path, start, end, sensors=None):
+    """查找 [start, end) 内各传感器连续超过告警阈值的时间段"""
+    backend = SQLiteBackend(db_path)
+    window_start, window_end = naive_epoch(start), naive_epoch(end)
+
+    # 原生粒度的预聚合中最高温度超过阈值的时间桶
+    thresholds = {}
+    hot_slots = {}
+    min_threshold = min(TEMPERATURE_THRESHOLDS.values())
+    for slot, sensor_name, mean, peak in backend.query_rollups(start, end, ROLLUP_SECONDS, sensors, min_threshold):
+        threshold = thresholds.get(sensor_name)
+        if threshold is None:
+            threshold = thresholds[sensor_name] = get_temperature_threshold(sensor_name)
+        if peak > threshold:
+            hot_slots.setdefault(sensor_name, []).append(slot)
+
+    # 读取这些时间段及其后一个桶的原始读数，以找到回落到阈值以下的读数
+    events = []
+    for sensor_name, slots in hot_slots.items():
+        for range_start, range_end in merge_slots(sorted(slots)):
+            rows = backend.query_range(
+                format_naive_epoch(max(range_start, window_start)),
+                format_naive_epoch(min(range_end + ROLLUP_SECONDS, window_end)),
+                [sensor_name]
+            )
+            events.extend(events_from_readings(sensor_name, rows, thresholds[sensor_name]))
+    return events
+
+def analyze(db_path, start, end, bucket_seconds=None, max_lag=ANALYSIS_MAX_LAG, sensors=None):
+    """分析 [start, end) 时间段内的传感器相关性与过热事件"""
+    bucket_seconds = choose_bucket_seconds(naive_epoch(end) - naive_epoch(start), bucket_seconds)
+    first, count, series = load_aligned_series(db_path, start, end, bucket_seconds, sensors)
+    names = sorted(series)
+    max_lag = max(0, min(max_lag, count - 1, ANALYSIS_MAX_LAG_LIMIT))
+
+    standardized = [standardize(series[name]) for name in names]
+    pairs, matrix = correlate_series(names, standardized, max_lag, bucket_seconds)
+
+    heat_events = detect_heat_events(db_path, start, end, sensors)
+    heat_events.sort(key=lambda event: event['start'])
+
+    return {
+        'from': start,
+        'to': end,
+        'bucket_seconds': bucket_seconds,
+        'buckets': count,
+        'max_lag': max_lag,
+        'sensors': names,
+        'correlation_matrix': matrix,
+        'correlations': pairs,
+        'heat_events': heat_events
+    }
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""基于EWMA基线的温度异常检测
+
+为每个传感器（可选按小时分桶）维护指数加权的均值与方差，每次读数 O(1) 更新。
+读数明显高于自身基线时判定为异常，即使尚未超过 TEMPERATURE_THRESHOLDS 中的固定阈值，
+例如风扇故障导致NVMe比平时高15°C。
+"""
+import json
+import logging
+import math
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from storage import SQLiteBackend, format_timestamp
+
+logger = logging.getLogger(__name__)
+
+# 基线状态文件（采集器每次运行都是新进程，状态需要持久化）
+BASELINE_FILE = 'anomaly_baselines.json'
+
+# EWMA平滑系数：按每分钟一次采集，0.01 约等于最近100分钟的加权窗口
+ANOMALY_ALPHA = 0.01
+
+# 是否按小时分别建立基线（白天/夜间负载差异较大时开启）
+ANOMALY_BY_HOUR = False
+
+# 判定异常需同时满足：z-score 超过阈值、高出基线的温度超过最小差值、基线样本数足够
+ANOMALY_Z_THRESHOLD = 4.0
+ANOMALY_MIN_DELTA = 8.0
+ANOMALY_WARMUP_SAMPLES = 60
+
+# 首次运行时用最近多少小时的历史数据预热基线
+ANOMALY_BACKFILL_HOURS = 168
+
+def baseline_key(sensor_name, hour):
+    return f"{sensor_name}@{hour}" if ANOMALY_BY_HOUR else sensor_name
+
+def update_baseline(state, value):
+    """用一个读数更新 [mean, var, count]，返回更新前的状态"""
+    mean, var, count = state
+    if count == 0:
+        state[:] = [value, 0.0, 1]
+    else:
+        diff = value - mean
+        increment = ANOMALY_ALPHA * diff
+        state[:] = [mean + increment, (1 - ANOMALY_ALPHA) * (var + diff * increment), count + 1]
+    return mean, var, count
+
+def observe(state, value):
+    """用基线评估一个读数，返回 (均值, 标准差, z-score)；读数异常时返回该三元组且不更新基线
+
+    异常读数不计入基线，否则持续的偏高（如风扇故障）会在几次采集后抬高均值和方差，
+    使告警在故障仍存在时停止。读数正常时更新基线并返回 None。
+    """
+    mean, var, count = state
+    if count >= ANOMALY_WARMUP_SAMPLES:
+        stddev = math.sqrt(var)
+        delta = value - mean
+        # 方差极小时以0.5°C为下限，避免量化误差导致的虚假高z-score
+        zscore = delta / max(stddev, 0.5)
+        if delta >= ANOMALY_MIN_DELTA and zscore >= ANOMALY_Z_THRESHOLD:
+            return mean, stddev, zscore
+    update_baseline(state, value)
+    return None
+
+def backfill_baselines(db_path):
+    """从历史数据预热所有传感器的基线"""
+    start = format_timestamp(time.time() - ANOMALY_BACKFILL_HOURS * 3600)
+    baselines = {}
+    try:
+        rows = SQLiteBackend(db_path).query_range(start)
+    except sqlite3.Error as e:
+        logger.warning(f"Could not backfill anomaly baselines: {e}")
+        return baselines
+
+    for row in rows:
+        # 时间戳格式为 'YYYY-MM-DD HH:MM:SS'，直接截取小时
+        key = baseline_key(row['sensor_name'], int(row['timestamp'][11:13]))
+        state = baselines.get(key)
+        if state is None:
+            state = baselines[key] = [0.0, 0.0, 0]
+        # 预热时计入全部历史读数，删除基线文件即可接受新的正常温度
+        update_baseline(state, row['temperature'])
+
+    logger.info(f"Backfilled anomaly baselines for {len(baselines)} keys from {len(rows)} readings")
+    return baselines
+
+def load_baselines(db_path):
+    """读取基线状态；文件不存在或配置已变化时从历史数据重新预热"""
+    if os.path.exists(BASELINE_FILE):
+        try:
+            with open(BASELINE_FILE, 'r') as f:
+                saved = json.load(f)
+            if saved.get('alpha') == ANOMALY_ALPHA and saved.get('by_hour') == ANOMALY_BY_HOUR:
+                return saved['baselines']
+        except (OSError, ValueError, KeyError):
+            pass
+    return backfill_baselines(db_path)
+
+def save_baselines(baselines):
+    tmp_path = f"{BASELINE_FILE}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump({'alpha': ANOMALY_ALPHA, 'by_hour': ANOMALY_BY_HOUR, 'baselines': baselines}, f)
+        os.replace(tmp_path, BASELINE_FILE)
+    except OSError as e:
+        logger.error(f"Failed to save anomaly baselines: {e}")
+
+def detect_anomalies(temperatures, db_path):
+    """用本次读数评估并更新基线，返回异常列表
+
+    每项包含 sensor_name, temperature, baseline, stddev, zscore。
+    """
+    baselines = load_baselines(db_path)
+    hour = datetime.now().hour
+    anomalies = []
+
+    for temp_data in temperatures:
+        sensor_name = temp_data['sensor_name']
+        temperature = temp_data['temperature']
+        key = baseline_key(sensor_name, hour)
+        state = baselines.get(key)
+        if state is None:
+            state = baselines[key] = [0.0, 0.0, 0]
+
+        result = observe(state, temperature)
+        if result is not None:
+            mean, stddev, zscore = result
+            anomalies.append({
+                'sensor_name': sensor_name,
+                'temperature': temperature,
+                'baseline': mean,
+                'stddev': stddev,
+                'zscore': zscore
+            })
+
+    save_baselines(baselines)
+    return anomalies
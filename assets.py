@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""前端依赖的本地副本
+
+Chart.js 及其日期适配器随项目保存在 static/vendor/ 中，由Web服务器以带内容哈希的URL提供，
+可长期缓存，离线环境也能正常显示图表。static/vendor/SHA256SUMS 记录每个文件的sha256，
+Web服务器只提供校验通过的文件，不会回退到CDN。
+
+    python3 assets.py           # 校验本地副本（不联网）
+    python3 assets.py --update  # 升级版本时在可联网的机器上重新下载并更新 SHA256SUMS，随后一起提交
+"""
+import argparse
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+# (名称, static/ 下的路径, 下载地址)；下载地址只在 --update 时使用
+VENDOR_ASSETS = [
+    ('chart.js', 'vendor/chart.umd.js',
+     'https://cdn.jsdelivr.net/npm/chart.js@4.3.0/dist/chart.umd.js'),
+    ('chartjs-adapter-date-fns', 'vendor/chartjs-adapter-date-fns.bundle.min.js',
+     'https://cdn.jsdelivr.net/npm/chartjs-adapter-date-fns@3.0.0/dist/chartjs-adapter-date-fns.bundle.min.js'),
+]
+
+# sha256sum 格式的校验文件，可在 static/vendor/ 下用 sha256sum -c SHA256SUMS 核对
+CHECKSUM_FILE = os.path.join(STATIC_DIR, 'vendor', 'SHA256SUMS')
+
+# 带内容哈希的资源内容不会变化，浏览器可缓存一年
+ASSET_MAX_AGE = 365 * 86400
+
+def hashed_path(path, data):
+    """vendor/chart.umd.js -> vendor/chart.umd.<哈希>.js"""
+    base, ext = os.path.splitext(path)
+    return f"{base}.{hashlib.sha256(data).hexdigest()[:16]}{ext}"
+
+def load_checksums():
+    """读取 SHA256SUMS，返回 {文件名: sha256}"""
+    checksums = {}
+    try:
+        with open(CHECKSUM_FILE, 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2:
+                    checksums[parts[1].lstrip('*')] = parts[0].lower()
+    except OSError:
+        pass
+    return checksums
+
+def read_verified(path, checksums):
+    """读取 static/ 下的文件并校验sha256，返回 (内容, 错误信息)，校验失败时内容为 None"""
+    try:
+        with open(os.path.join(STATIC_DIR, path), 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        return None, f"static/{path} is missing ({e.strerror})"
+
+    expected = checksums.get(os.path.basename(path))
+    if expected is None:
+        return None, f"static/{path} has no entry in {os.path.relpath(CHECKSUM_FILE, STATIC_DIR)}"
+    actual = hashlib.sha256(data).hexdigest()
+    if actual != expected:
+        return None, f"static/{path} checksum mismatch: expected {expected}, got {actual}"
+    return data, None
+
+def load_assets(url_prefix='/assets/'):
+    """读取并校验本地副本，预先压缩
+
+    返回 (urls, files)：urls 为 {名称: 页面中使用的URL}，
+    files 为 {带哈希的路径: (内容, gzip内容, mimetype)}。
+    缺失或校验失败的文件不提供，页面中对应URL返回404，不会改用CDN。
+    """
+    checksums = load_checksums()
+    urls = {}
+    files = {}
+    for name, path, source_url in VENDOR_ASSETS:
+        data, error = read_verified(path, checksums)
+        if data is None:
+            logger.error(f"Not serving {name}: {error}; charts will not render")
+            urls[name] = url_prefix + path
+            continue
+
+        hashed = hashed_path(path, data)
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        files[hashed] = (data, gzip.compress(data, 9), mimetype)
+        urls[name] = url_prefix + hashed
+    return urls, files
+
+def check_assets():
+    """校验所有本地副本，返回失败的数量"""
+    checksums = load_checksums()
+    failures = 0
+    for name, path, source_url in VENDOR_ASSETS:
+        data, error = read_verified(path, checksums)
+        if data is None:
+            print(f"FAILED {name}: {error}")
+            failures += 1
+        else:
+            print(f"OK     {name}: static/{path}")
+    return failures
+
+def update_assets(timeout=10):
+    """重新下载所有资源并重写 SHA256SUMS，返回下载失败的数量；有失败时不修改任何文件"""
+    downloaded = []
+    for name, path, source_url in VENDOR_ASSETS:
+        try:
+            with urllib.request.urlopen(source_url, timeout=timeout) as response:
+                downloaded.append((name, path, response.read()))
+        except OSError as e:
+            print(f"Failed to download {name} from {source_url}: {e}")
+    if len(downloaded) != len(VENDOR_ASSETS):
+        return len(VENDOR_ASSETS) - len(downloaded)
+
+    os.makedirs(os.path.dirname(CHECKSUM_FILE), exist_ok=True)
+    lines = []
+    for name, path, data in downloaded:
+        dest = os.path.join(STATIC_DIR, path)
+        tmp_path = f"{dest}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, dest)
+        lines.append(f"{hashlib.sha256(data).hexdigest()}  {os.path.basename(path)}\n")
+        print(f"Downloaded {name} to static/{path} ({len(data)} bytes)")
+
+    with open(CHECKSUM_FILE, 'w') as f:
+        f.writelines(lines)
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Verify vendored frontend assets in static/')
+    parser.add_argument('--update', action='store_true',
+                        help='download the pinned versions and rewrite SHA256SUMS (requires network)')
+    args = parser.parse_args()
+    failures = update_assets() if args.update else check_assets()
+    raise SystemExit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""比较两次基准测试结果，超过阈值的退化以非零状态码退出
+
+示例:
+    python3 bench/compare.py bench/results/abc1234.json bench/results/def5678.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+# 以这些后缀结尾的指标越大越好，其余（耗时、字节数）越小越好
+HIGHER_IS_BETTER = ('rows_per_sec',)
+
+# 仅用于描述数据规模、不参与比较的指标
+IGNORED_SUFFIXES = ('.rows', '.seconds')
+
+def flatten(results, prefix=''):
+    """将嵌套结果展开为 {'queries.24h.p50_ms': 值}"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+def compare(baseline, current, threshold):
+    """返回 [(指标, 基线值, 当前值, 变化百分比, 是否退化)]"""
+    base = flatten(baseline['results'])
+    cur = flatten(current['results'])
+    rows = []
+    for name in sorted(base.keys() & cur.keys()):
+        if name.endswith(IGNORED_SUFFIXES) or not base[name]:
+            continue
+        change = (cur[name] - base[name]) / base[name] * 100
+        worse = -change if name.endswith(HIGHER_IS_BETTER) else change
+        rows.append((name, base[name], cur[name], change, worse > threshold))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=10.0, help='regression threshold in percent')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    if baseline['meta']['params'] != current['meta']['params']:
+        print("Warning: benchmark parameters differ between the two runs")
+
+    print(f"{baseline['meta']['commit']} -> {current['meta']['commit']}")
+    regressions = 0
+    for name, base, cur, change, regressed in compare(baseline, current, args.threshold):
+        marker = '  REGRESSION' if regressed else ''
+        print(f"{name:45s} {base:14.3f} {cur:14.3f} {change:+8.1f}%{marker}")
+        regressions += regressed
+
+    if regressions:
+        print(f"{regressions} metric(s) regressed by more than {args.threshold}%")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""存储后端一致性检查：对每个后端执行相同的操作序列并比较结果
+
+示例:
+    python3 bench/conformance.py
+"""
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import init_db
+from storage import BACKENDS, RingBufferBackend, SQLiteBackend, format_timestamp
+
+SENSORS = ['k10temp-pci-00c3_Tctl_temp1', 'nvme-pci-0100_Composite_temp1', 'thermal_thermal_zone0']
+
+def make_backend(name, workdir):
+    if name == 'sqlite':
+        init_db.DB_PATH = os.path.join(workdir, f"{name}.db")
+        init_db.init_database()
+        return SQLiteBackend(init_db.DB_PATH)
+    # 容量刚好覆盖一小时，写入两小时数据以检验环绕
+    return RingBufferBackend(hours=1, interval=60)
+
+def fill(backend, base):
+    """写入两小时、每分钟一批的读数，返回时间戳列表"""
+    timestamps = []
+    for minute in range(120):
+        ts = format_timestamp(base + minute * 60)
+        readings = [
+            {'sensor_name': name, 'temperature': 40.0 + i * 5 + (minute % 7) * 0.5, 'unit': 'C'}
+            for i, name in enumerate(SENSORS)
+        ]
+        backend.write_batch(readings, ts)
+        timestamps.append(ts)
+    return timestamps
+
+def check(condition, message):
+    if not condition:
+        raise AssertionError(message)
+
+def normalized(rows):
+    return sorted((r['timestamp'], r['sensor_name'], r['temperature']) for r in rows)
+
+def run_checks(backend, timestamps):
+    """返回各项查询的结果，供与其他后端对比"""
+    results = {}
+
+    # 只查询最后一小时（环形缓冲保留范围内）
+    start, end = timestamps[61], timestamps[-1]
+    rows = backend.query_range(start)
+    check(len(rows) == 59 * len(SENSORS), f"query_range returned {len(rows)} rows")
+    check([r['timestamp'] for r in rows] == sorted(r['timestamp'] for r in rows), "query_range not ordered by timestamp")
+    results['query_range'] = normalized(rows)
+
+    rows = backend.query_range(start, timestamps[70], sensors=SENSORS[:1])
+    check(len(rows) == 10 and all(r['sensor_name'] == SENSORS[0] for r in rows), "query_range end/sensors filter")
+    results['query_range_filtered'] = normalized(rows)
+
+    check(backend.query_range(format_timestamp(time.time() + 86400)) == [], "query_range in the future should be empty")
+
+    current = backend.latest()
+    check([r['sensor_name'] for r in current] == sorted(SENSORS), "latest must return one row per sensor, sorted")
+    check(all(r['timestamp'] == end for r in current), "latest must return the newest timestamp")
+    results['latest'] = normalized(current)
+
+    stats = backend.stats(start, end)
+    check(stats['total_readings'] == 59 * len(SENSORS), f"stats count {stats['total_readings']}")
+    results['stats'] = stats
+
+    empty = backend.stats(format_timestamp(time.time() + 86400))
+    check(empty['total_readings'] == 0 and empty['max_temp'] is None, "stats on empty range")
+    return results
+
+def main():
+    workdir = tempfile.mkdtemp(prefix='temperature-conformance-')
+    base = int(time.time()) - 3 * 3600
+    try:
+        all_results = {}
+        for name in BACKENDS:
+            backend = make_backend(name, workdir)
+            timestamps = fill(backend, base)
+            all_results[name] = run_checks(backend, timestamps)
+            print(f"{name}: ok")
+
+        reference_name, reference = next(iter(all_results.items()))
+        for name, results in all_results.items():
+            for key, value in results.items():
+                if key == 'stats':
+                    for field, expected in reference[key].items():
+                        check(math.isclose(value[field], expected, rel_tol=1e-9), f"{name} stats.{field} differs from {reference_name}")
+                else:
+                    check(value == reference[key], f"{name} {key} differs from {reference_name}")
+        print("All backends conform")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""伪造的硬件环境：sensors / nvidia-smi / 通知命令与 /sys/class/thermal，使基准测试完全离线运行"""
+import json
+import os
+import stat
+import sys
+from contextlib import contextmanager
+
+import temperature_collector
+
+# sensors -A -j 的输出，芯片/传感器命名与 bench/generate_data.py 的模板一致
+FAKE_SENSORS_JSON = {
+    'k10temp-pci-00c3': {
+        'Adapter': 'PCI adapter',
+        'Tctl': {'temp1_input': 52.125},
+        'Tccd1': {'temp3_input': 49.5}
+    },
+    'nvme-pci-0100': {
+        'Adapter': 'PCI adapter',
+        'Composite': {'temp1_input': 40.85, 'temp1_max': 81.85, 'temp1_crit': 84.85},
+        'Sensor 1': {'temp2_input': 40.85},
+        'Sensor 2': {'temp3_input': 44.85}
+    },
+    'nvme-pci-0400': {
+        'Adapter': 'PCI adapter',
+        'Composite': {'temp1_input': 37.85, 'temp1_max': 81.85, 'temp1_crit': 84.85},
+        'Sensor 1': {'temp2_input': 37.85},
+        'Sensor 2': {'temp3_input': 41.85}
+    },
+    'iwlwifi_1-virtual-0': {
+        'Adapter': 'Virtual device',
+        'temp1': {'temp1_input': 41.0}
+    },
+    'r8169_0_2a00:00-mdio-0': {
+        'Adapter': 'MDIO adapter',
+        'temp1': {'temp1_input': 45.5}
+    }
+}
+
+FAKE_SENSORS_SCRIPT = '''#!{python}
+import sys
+if '-j' in sys.argv:
+    sys.stdout.write(open({json_path!r}).read())
+'''
+
+FAKE_NVIDIA_SMI_SCRIPT = '''#!/bin/sh
+echo 43
+'''
+
+FAKE_NOOP_SCRIPT = '''#!/bin/sh
+exit 0
+'''
+
+def write_executable(path, content):
+    with open(path, 'w') as f:
+        f.write(content)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+@contextmanager
+def fake_environment(root, thermal_zones=1):
+    """在 root 目录下创建伪造的命令与sysfs，并在退出时恢复 PATH 与 THERMAL_ROOT"""
+    bin_dir = os.path.join(root, 'fakebin')
+    thermal_root = os.path.join(root, 'sys_class_thermal')
+    os.makedirs(bin_dir, exist_ok=True)
+
+    json_path = os.path.join(root, 'sensors.json')
+    with open(json_path, 'w') as f:
+        json.dump(FAKE_SENSORS_JSON, f)
+
+    write_executable(os.path.join(bin_dir, 'sensors'), FAKE_SENSORS_SCRIPT.format(python=sys.executable, json_path=json_path))
+    write_executable(os.path.join(bin_dir, 'nvidia-smi'), FAKE_NVIDIA_SMI_SCRIPT)
+    for name in ('notify-send', 'zenity'):
+        write_executable(os.path.join(bin_dir, name), FAKE_NOOP_SCRIPT)
+
+    for zone in range(thermal_zones):
+        zone_dir = os.path.join(thermal_root, f"thermal_zone{zone}")
+        os.makedirs(zone_dir, exist_ok=True)
+        with open(os.path.join(zone_dir, 'temp'), 'w') as f:
+            f.write(f"{42000 + zone * 500}\n")
+
+    old_path = os.environ.get('PATH', '')
+    old_thermal_root = temperature_collector.THERMAL_ROOT
+    os.environ['PATH'] = bin_dir + os.pathsep + old_path
+    temperature_collector.THERMAL_ROOT = thermal_root
+    try:
+        yield
+    finally:
+        os.environ['PATH'] = old_path
+        temperature_collector.THERMAL_ROOT = old_thermal_root
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""生成可复现的合成温度数据，写入 temperature_monitor.db 格式的数据库
+
+示例:
+    python3 bench/generate_data.py --hosts 2 --sensors 12 --hours 168
+"""
+import argparse
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import init_db
+
+# 传感器模板：(名称, 基准温度, 日内波动幅度, 负载影响幅度, 小数位数)
+# 名称与 sensors / sysfs / nvidia-smi 实际输出的命名方式一致
+SENSOR_TEMPLATES = [
+    ('k10temp-pci-00c3_Tctl_temp1', 48.0, 4.0, 25.0, 3),
+    ('k10temp-pci-00c3_Tccd1_temp3', 45.0, 4.0, 28.0, 3),
+    ('nvme-pci-0100_Composite_temp1', 38.0, 2.0, 12.0, 2),
+    ('nvme-pci-0100_Sensor 1_temp2', 38.0, 2.0, 12.0, 2),
+    ('nvme-pci-0100_Sensor 2_temp3', 42.0, 2.0, 15.0, 2),
+    ('nvme-pci-0400_Composite_temp1', 36.0, 2.0, 10.0, 2),
+    ('nvme-pci-0400_Sensor 1_temp2', 36.0, 2.0, 10.0, 2),
+    ('nvme-pci-0400_Sensor 2_temp3', 40.0, 2.0, 13.0, 2),
+    ('iwlwifi_1-virtual-0_temp1_temp1', 40.0, 1.5, 6.0, 0),
+    ('r8169_0_2a00:00-mdio-0_temp1_temp1', 44.0, 1.5, 5.0, 1),
+    ('nvidia_gpu_0', 40.0, 3.0, 35.0, 0),
+    ('thermal_thermal_zone0', 42.0, 3.0, 18.0, 1),
+]
+
+def sensor_names(hosts, sensors_per_host):
+    """返回 [(传感器名, 模板)]；多主机时以 hostNN_ 前缀区分，超出模板数量时追加热区域"""
+    names = []
+    for host in range(hosts):
+        prefix = f"host{host:02d}_" if host else ''
+        for i in range(sensors_per_host):
+            if i < len(SENSOR_TEMPLATES):
+                template = SENSOR_TEMPLATES[i]
+                name = template[0]
+            else:
+                template = SENSOR_TEMPLATES[-1]
+                name = f"thermal_thermal_zone{i - len(SENSOR_TEMPLATES) + 1}"
+            names.append((prefix + name, template))
+    return names
+
+def generate_readings(hosts=1, sensors_per_host=12, hours=24, interval=60, seed=42, end=None):
+    """按时间顺序生成 (timestamp, sensor_name, temperature, unit) 记录
+
+    温度 = 基准 + 日内正弦波动 + 主机负载（AR(1)随机过程，偶发高负载）× 传感器负载系数 + 噪声
+    """
+    rng = random.Random(seed)
+    end = end or datetime.now().replace(microsecond=0)
+    start = end - timedelta(hours=hours)
+    names = sensor_names(hosts, sensors_per_host)
+    loads = [0.2] * hosts
+    steps = int(hours * 3600 // interval)
+
+    for step in range(steps + 1):
+        ts = start + timedelta(seconds=step * interval)
+        ts_str = ts.strftime('%Y-%m-%d %H:%M:%S')
+        day_phase = math.sin((ts.hour * 3600 + ts.minute * 60 + ts.second) / 86400 * 2 * math.pi - math.pi / 2)
+
+        for host in range(hosts):
+            load = 0.9 * loads[host] + 0.1 * rng.random()
+            if rng.random() < 0.002:
+                load = 0.8 + 0.2 * rng.random()
+            loads[host] = min(load, 1.0)
+
+        for index, (name, (_, base, daily, load_gain, digits)) in enumerate(names):
+            host = index // sensors_per_host
+            value = base + daily * day_phase + load_gain * loads[host] + rng.gauss(0, 0.3)
+            yield (ts_str, name, round(value, digits), 'C')
+
+def fill_database(db_path, hosts=1, sensors_per_host=12, hours=24, interval=60, seed=42, batch_size=50000):
+    """生成数据并写入数据库，返回 (写入行数, 耗时秒)"""
+    init_db.DB_PATH = db_path
+    init_db.init_database()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA synchronous = OFF')
+    cursor = conn.cursor()
+
+    start = time.perf_counter()
+    total = 0
+    batch = []
+    for row in generate_readings(hosts, sensors_per_host, hours, interval, seed):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            cursor.executemany('''
+                INSERT INTO temperature_readings (timestamp, sensor_name, temperature, unit)
+                VALUES (?, ?, ?, ?)
+            ''', batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        cursor.executemany('''
+            INSERT INTO temperature_readings (timestamp, sensor_name, temperature, unit)
+            VALUES (?, ?, ?, ?)
+        ''', batch)
+        total += len(batch)
+
+    # 直接写入的原始数据没有经过存储后端，由 init_database 回填这些读数所在时间桶的预聚合
+    conn.commit()
+    conn.close()
+    init_db.init_database()
+    return total, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic temperature data')
+    parser.add_argument('--db', default='temperature_monitor.db', help='database path')
+    parser.add_argument('--hosts', type=int, default=1, help='number of hosts (N)')
+    parser.add_argument('--sensors', type=int, default=len(SENSOR_TEMPLATES), help='sensors per host (M)')
+    parser.add_argument('--hours', type=float, default=24, help='duration to generate (T)')
+    parser.add_argument('--interval', type=int, default=60, help='seconds between readings')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rows, elapsed = fill_database(args.db, args.hosts, args.sensors, args.hours, args.interval, args.seed)
+    print(f"Inserted {rows} readings in {elapsed:.2f}s ({rows / elapsed:.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Web服务负载测试：不同工作进程数下的请求吞吐与延迟
+
+在临时目录中生成合成数据，依次以每个工作进程数启动 serve.py，用多个客户端进程
+通过keep-alive连接持续请求，统计每秒请求数与延迟分位数。客户端与服务端运行在同一台
+机器上，工作进程数超过 CPU核数 / 2 后吞吐通常不再增长。
+
+示例:
+    python3 bench/load_test.py --workers 1,2,4 --clients 16 --duration 10
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from generate_data import fill_database
+from run_bench import git_commit, timings_summary
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def wait_for_server(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/metrics')
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+def client(port, paths, deadline, results):
+    """在一个keep-alive连接上循环请求，连接断开时重连"""
+    latencies = []
+    errors = 0
+    conn = None
+    index = 0
+    while time.monotonic() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        start = time.perf_counter()
+        try:
+            if conn is None:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+            if response.getheader('Connection', '').lower() == 'close':
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn = None
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+    results.put((latencies, errors))
+
+def run_load(port, paths, clients, duration):
+    results = multiprocessing.Queue()
+    deadline = time.monotonic() + duration
+    processes = [multiprocessing.Process(target=client, args=(port, paths, deadline, results)) for _ in range(clients)]
+    for process in processes:
+        process.start()
+
+    latencies = []
+    errors = 0
+    for _ in processes:
+        client_latencies, client_errors = results.get()
+        latencies.extend(client_latencies)
+        errors += client_errors
+    for process in processes:
+        process.join()
+
+    summary = timings_summary(latencies) if latencies else {}
+    summary.update({'requests': len(latencies), 'errors': errors, 'requests_per_sec': len(latencies) / duration})
+    return summary
+
+def run_workers(workdir, workers, args):
+    port = free_port()
+    command = [sys.executable, os.path.join(REPO_DIR, 'serve.py'), '--host', '127.0.0.1', '--port', str(port),
+               '--workers', str(workers), '--threads', str(args.threads)]
+    server = subprocess.Popen(command, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_server(port)
+        run_load(port, args.paths, args.clients, 1)  # 预热
+        return run_load(port, args.paths, args.clients, args.duration)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test serve.py with increasing worker counts')
+    parser.add_argument('--workers', default=','.join(str(n) for n in (1, 2, 4, 8) if n <= (os.cpu_count() or 1)) or '1',
+                        help='comma separated worker counts')
+    parser.add_argument('--threads', type=int, default=8, help='request threads per worker')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent client processes')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per worker count')
+    parser.add_argument('--hours', type=float, default=24, help='history to generate')
+    parser.add_argument('--paths', type=lambda value: value.split(','),
+                        default=['/api/temperatures?hours=1', '/metrics', '/api/temperatures?hours=24'],
+                        help='comma separated request paths')
+    parser.add_argument('--output', help='result JSON path (default: bench/results/<commit>-load.json)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='temperature-load-')
+    try:
+        fill_database(os.path.join(workdir, 'temperature_monitor.db'), hours=args.hours)
+        results = {}
+        for workers in (int(n) for n in args.workers.split(',')):
+            results[workers] = run_workers(workdir, workers, args)
+            print(f"workers={workers}: {results[workers]['requests_per_sec']:.0f} req/s, "
+                  f"p50 {results[workers]['p50_ms']:.1f} ms, p95 {results[workers]['p95_ms']:.1f} ms, "
+                  f"errors {results[workers]['errors']}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'cpu_count': os.cpu_count(),
+            'params': vars(args)
+        },
+        'results': results
+    }
+    output = os.path.abspath(args.output or os.path.join(BENCH_DIR, 'results', f"{git_commit()}-load.json"))
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
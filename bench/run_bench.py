@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""基准测试：采集延迟、写入吞吐、查询延迟、API负载大小与内存峰值
+
+在临时目录中生成合成数据并伪造硬件环境，完全离线运行。结果写成JSON，
+可用 bench/compare.py 比较不同提交之间的差异。
+
+示例:
+    python3 bench/run_bench.py --hosts 1 --sensors 12 --hours 24
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import init_db
+import temperature_collector
+import web_server
+from storage import BACKENDS, RingBufferBackend, SQLiteBackend, create_backend
+from fake_env import fake_environment
+from generate_data import fill_database
+
+QUERY_WINDOWS = (1, 6, 24, 168)
+
+def git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return 'unknown'
+
+def timings_summary(samples_ms):
+    """返回耗时样本的统计值（毫秒）"""
+    ordered = sorted(samples_ms)
+    return {
+        'mean_ms': statistics.fmean(ordered),
+        'p50_ms': ordered[len(ordered) // 2],
+        'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        'max_ms': ordered[-1]
+    }
+
+def measure(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return timings_summary(samples)
+
+def bench_collector_tick(repeat):
+    """完整采集一次（伪造数据源 + 告警 + 写库）的延迟"""
+    return measure(temperature_collector.collect_temperatures, repeat)
+
+def bench_insert_throughput(backend, sensors, batches):
+    """存储后端 write_batch 的写入吞吐（行/秒）"""
+    readings = [
+        {'sensor_name': f"bench_sensor_{i}", 'temperature': 40.0 + i % 10, 'unit': 'C'}
+        for i in range(sensors)
+    ]
+    start = time.perf_counter()
+    for _ in range(batches):
+        backend.write_batch(readings)
+    elapsed = time.perf_counter() - start
+    return {'rows': sensors * batches, 'seconds': elapsed, 'rows_per_sec': sensors * batches / elapsed}
+
+def bench_queries(repeat):
+    """各时间窗口下 get_temperature_data 的延迟、API负载大小与内存峰值"""
+    results = {}
+    for hours in QUERY_WINDOWS:
+        entry = measure(lambda: web_server.get_temperature_data(hours), repeat)
+
+        tracemalloc.start()
+        data = web_server.get_temperature_data(hours)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        entry['rows'] = len(data['data'])
+        entry['payload_bytes'] = len(json.dumps(data))
+        entry['peak_alloc_bytes'] = peak
+        results[f"{hours}h"] = entry
+    return results
+
+def run(args):
+    # 采集器的告警记录、快照等文件均使用相对路径，切换到临时目录避免污染仓库
+    workdir = tempfile.mkdtemp(prefix='temperature-bench-')
+    os.chdir(workdir)
+    try:
+        return run_in(workdir, args)
+    finally:
+        os.chdir(REPO_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def run_in(workdir, args):
+    db_path = os.path.join(workdir, 'temperature_monitor.db')
+    temperature_collector.DB_PATH = db_path
+    web_server.DB_PATH = db_path
+
+    rows, seconds = fill_database(db_path, args.hosts, args.sensors, args.hours, args.interval, args.seed)
+    results = {
+        'generate': {'rows': rows, 'seconds': seconds, 'rows_per_sec': rows / seconds},
+        'db_size_bytes': os.path.getsize(db_path)
+    }
+
+    with fake_environment(workdir, thermal_zones=max(1, args.sensors - 11)):
+        results['collector_tick'] = bench_collector_tick(args.repeat)
+
+    # 写入吞吐使用独立的存储，避免测试数据影响后面的查询结果
+    if args.backend == 'sqlite':
+        init_db.DB_PATH = os.path.join(workdir, 'insert_bench.db')
+        init_db.init_database()
+        insert_backend = SQLiteBackend(init_db.DB_PATH)
+    else:
+        insert_backend = RingBufferBackend()
+    results['insert'] = bench_insert_throughput(insert_backend, args.sensors, args.insert_batches)
+
+    start = time.perf_counter()
+    web_server._storage['backend'] = create_backend(args.backend, db_path)
+    results['storage_load_seconds'] = time.perf_counter() - start
+    results['queries'] = bench_queries(args.repeat)
+    results['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'params': vars(args)
+        },
+        'results': results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Run temperature monitor benchmarks offline')
+    parser.add_argument('--hosts', type=int, default=1, help='number of hosts (N)')
+    parser.add_argument('--sensors', type=int, default=12, help='sensors per host (M)')
+    parser.add_argument('--hours', type=float, default=24, help='history to generate (T)')
+    parser.add_argument('--interval', type=int, default=60, help='seconds between readings')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--backend', choices=BACKENDS, default='sqlite', help='storage backend serving queries')
+    parser.add_argument('--repeat', type=int, default=5, help='repetitions per timed measurement')
+    parser.add_argument('--insert-batches', type=int, default=200, help='batches for insert throughput')
+    parser.add_argument('--output', help='result JSON path (default: bench/results/<commit>-<backend>.json)')
+    args = parser.parse_args()
+
+    # 采集器每次采集都会逐条输出日志，基准测试中只保留警告
+    logging.getLogger().setLevel(logging.WARNING)
+
+    output = os.path.abspath(args.output or os.path.join(BENCH_DIR, 'results', f"{git_commit()}-{args.backend}.json"))
+    report = run(args)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report['results'], indent=2))
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""gunicorn 配置，与 serve.py 读取相同的环境变量
+
+    gunicorn -c gunicorn.conf.py web_server:app
+"""
+from instrumentation import clear_worker_timings
+from serve import load_config
+
+_config = load_config()
+
+bind = f"{_config['host']}:{_config['port']}"
+workers = _config['workers']
+worker_class = 'gthread'
+threads = _config['threads']
+keepalive = _config['keepalive']
+timeout = _config['timeout']
+graceful_timeout = _config['graceful_timeout']
+
+def on_starting(server):
+    clear_worker_timings()
+
+def post_worker_init(worker):
+    # gunicorn 工作进程启动后注册剖析开关、定期写出耗时统计并预先渲染首页，与 serve.py 一致；
+    # gunicorn 主进程不会转发 SIGUSR1，因此不传 master_pid，/api/profile 只切换处理请求的工作进程
+    from web_server import init_worker, warm_caches
+    init_worker()
+    warm_caches()
+
+def worker_exit(server, worker):
+    from web_server import flush_worker_stats
+    flush_worker_stats()
@@ -2,6 +2,8 @@
 import sqlite3
 import os
 
+from storage import ROLLUP_SCHEMA, ROLLUP_SECONDS
+
 DB_PATH = 'temperature_monitor.db'
 
 def init_database():
@@ -26,6 +28,47 @@ def init_database():
         CREATE INDEX IF NOT EXISTS idx_sensor_name ON temperature_readings(sensor_name)
     ''')
     
+    # 按传感器查询最新读数（storage.SQLiteBackend.latest）使用
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_sensor_timestamp ON temperature_readings(sensor_name, timestamp)
+    ''')
+    
+    # 预聚合表，供 /api/analysis 使用。采集器写入时会自行建表，因此不能以“表为空”判断是否需要回填：
+    # 对上次检查之后新增读数所在的时间桶逐桶比较读数数量，缺失或不完整的桶由原始数据重新计算。
+    # temperature_rollup_state 记录已检查到的最大读数id，首次运行时检查全部历史
+    cursor.execute(ROLLUP_SCHEMA)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS temperature_rollup_state (
+            checked_through_id INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('SELECT checked_through_id FROM temperature_rollup_state')
+    row = cursor.fetchone()
+    checked_through_id = row[0] if row else 0
+    cursor.execute('SELECT MIN(timestamp), MAX(id) FROM temperature_readings WHERE id > ?', (checked_through_id,))
+    first_unchecked, max_id = cursor.fetchone()
+    
+    if first_unchecked is not None:
+        cursor.execute('''
+            INSERT OR REPLACE INTO temperature_rollups (bucket, sensor_name, reading_count, temp_sum, temp_min, temp_max)
+            SELECT raw.bucket, raw.sensor_name, raw.reading_count, raw.temp_sum, raw.temp_min, raw.temp_max
+            FROM (
+                SELECT CAST(strftime('%s', timestamp) AS INTEGER) / {0} * {0} AS bucket, sensor_name,
+                       COUNT(*) AS reading_count, SUM(temperature) AS temp_sum,
+                       MIN(temperature) AS temp_min, MAX(temperature) AS temp_max
+                FROM temperature_readings
+                WHERE timestamp >= datetime(CAST(strftime('%s', ?) AS INTEGER) / {0} * {0}, 'unixepoch')
+                GROUP BY 1, 2
+            ) AS raw
+            LEFT JOIN temperature_rollups AS r
+                ON r.bucket = raw.bucket AND r.sensor_name = raw.sensor_name
+            WHERE r.reading_count IS NOT raw.reading_count
+        '''.format(ROLLUP_SECONDS), (first_unchecked,))
+        if cursor.rowcount > 0:
+            print(f"Backfilled {cursor.rowcount} rollup buckets")
+        cursor.execute('DELETE FROM temperature_rollup_state')
+        cursor.execute('INSERT INTO temperature_rollup_state (checked_through_id) VALUES (?)', (max_id,))
+    
     conn.commit()
     conn.close()
     print(f"Database initialized: {os.path.abspath(DB_PATH)}")
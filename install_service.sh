@@ -51,6 +51,7 @@ echo "Available commands:"
 echo "  sudo systemctl start temperature-monitor    # 启动服务"
 echo "  sudo systemctl stop temperature-monitor     # 停止服务"
 echo "  sudo systemctl restart temperature-monitor  # 重启服务"
+echo "  sudo systemctl reload temperature-monitor   # 平滑重载Web服务器"
 echo "  sudo systemctl status temperature-monitor   # 查看服务状态"
 echo "  systemctl --user status temperature-monitor # 查看用户服务状态"
 echo ""
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""采集器与Web服务器共用的自身性能埋点：分阶段计时直方图与可选的性能剖析"""
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# 计时直方图的桶上界（毫秒），最后一个桶为 +Inf
+TIMING_BUCKETS_MS = (0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# 剖析结果输出目录
+PROFILE_DIR = 'profiles'
+
+# 该文件存在时，采集器会对下一次采集做cProfile剖析（由Web服务器的 /api/profile 创建和删除）
+PROFILE_FLAG_FILE = 'profile.enable'
+
+# 采集各阶段耗时直方图，跨多次运行累积，供Web服务器的 /api/stats 展示
+COLLECTOR_STATS_FILE = 'collector_stats.json'
+
+# 多进程部署时每个Web工作进程定期把自己的直方图写到该目录下的 <PID>.json，/api/stats 合并展示
+WEB_STATS_DIR = 'web_stats'
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+_trace = threading.local()
+
+class Histogram:
+    """固定桶的累积计时直方图"""
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(TIMING_BUCKETS_MS) + 1)
+
+    def observe(self, value_ms):
+        self.count += 1
+        self.sum += value_ms
+        self.max = max(self.max, value_ms)
+        for i, bound in enumerate(TIMING_BUCKETS_MS):
+            if value_ms <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def merge(self, data):
+        """合并 to_dict() 输出的另一个直方图"""
+        self.count += data['count']
+        self.sum += data['sum_ms']
+        self.max = max(self.max, data['max_ms'])
+        for i, n in enumerate(data['buckets']):
+            self.buckets[i] += n
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum_ms': self.sum,
+            'avg_ms': self.sum / self.count if self.count else 0.0,
+            'max_ms': self.max,
+            'bucket_bounds_ms': list(TIMING_BUCKETS_MS) + ['+Inf'],
+            'buckets': list(self.buckets)
+        }
+
+def record_timing(stage, elapsed_ms):
+    """记录一次阶段耗时；若当前线程有进行中的trace，同时写入trace"""
+    with _histograms_lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = Histogram()
+        histogram.observe(elapsed_ms)
+
+    timings = getattr(_trace, 'timings', None)
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + elapsed_ms
+
+@contextmanager
+def timed(stage):
+    """统计 with 代码块的耗时"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(stage, (time.perf_counter() - start) * 1000)
+
+def begin_trace():
+    """开始收集当前线程本次处理（一次采集或一次请求）的各阶段耗时"""
+    _trace.timings = {}
+
+def end_trace():
+    """结束当前线程的trace，返回 {阶段: 毫秒}"""
+    timings = getattr(_trace, 'timings', None) or {}
+    _trace.timings = None
+    return timings
+
+def format_trace(event, timings, **fields):
+    """生成结构化日志行（JSON）"""
+    record = {'event': event, **fields, 'timings_ms': {k: round(v, 3) for k, v in timings.items()}}
+    return json.dumps(record, ensure_ascii=False)
+
+def get_timings():
+    """返回当前进程所有阶段的直方图"""
+    with _histograms_lock:
+        return {stage: histogram.to_dict() for stage, histogram in _histograms.items()}
+
+def reset_timings():
+    with _histograms_lock:
+        _histograms.clear()
+
+def load_timings(path):
+    """读取 save_timings 写出的累积直方图"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def merge_timings(sources):
+    """合并多份 to_dict() 形式的直方图集合，桶配置与当前不一致的数据丢弃"""
+    merged = {}
+    for timings in sources:
+        for stage, data in timings.items():
+            if data.get('bucket_bounds_ms') != list(TIMING_BUCKETS_MS) + ['+Inf']:
+                continue  # 桶配置已变化，丢弃旧数据
+            merged.setdefault(stage, Histogram()).merge(data)
+    return {stage: histogram.to_dict() for stage, histogram in merged.items()}
+
+def write_timings(path, timings):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(timings, f)
+    os.replace(tmp_path, path)
+
+def save_timings(path):
+    """将本进程的直方图累加进文件
+
+    采集器每次运行都是新进程，借此在多次运行之间累积统计。
+    """
+    write_timings(path, merge_timings([load_timings(path), get_timings()]))
+
+def worker_stats_path(pid=None):
+    return os.path.join(WEB_STATS_DIR, f"{pid or os.getpid()}.json")
+
+def load_worker_timings(exclude_pid=None):
+    """读取 WEB_STATS_DIR 中各工作进程写出的直方图，exclude_pid 的文件跳过"""
+    try:
+        names = os.listdir(WEB_STATS_DIR)
+    except OSError:
+        return []
+    skip = f"{exclude_pid}.json"
+    return [load_timings(os.path.join(WEB_STATS_DIR, name))
+            for name in sorted(names) if name.endswith('.json') and name != skip]
+
+def clear_worker_timings():
+    """服务启动时清空上一次运行留下的工作进程统计"""
+    try:
+        names = os.listdir(WEB_STATS_DIR)
+    except OSError:
+        return
+    for name in names:
+        os.remove(os.path.join(WEB_STATS_DIR, name))
+
+def profile_output_path(prefix, suffix):
+    # 文件名带进程号，多个Web工作进程同时剖析时互不覆盖
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    return os.path.join(PROFILE_DIR, f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.{suffix}")
+
+@contextmanager
+def maybe_profile(prefix):
+    """若存在 PROFILE_FLAG_FILE，则用cProfile剖析 with 代码块并保存为 .prof 文件"""
+    if not os.path.exists(PROFILE_FLAG_FILE):
+        yield None
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(profile_output_path(prefix, 'prof'))
+
+class SamplingProfiler:
+    """采样式剖析器
+
+    后台线程定期抓取所有线程的调用栈，可覆盖多线程服务器中的全部请求线程。
+    结果为折叠栈格式（每行 "frame;frame;... 次数"），可直接用于生成火焰图。
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self.running:
+            return
+        self.samples = Counter()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self, prefix='web'):
+        """停止采样并写出结果，返回输出文件路径"""
+        if not self.running:
+            return None
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+        path = profile_output_path(prefix, 'folded')
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def toggle(self, prefix='web'):
+        if self.running:
+            return self.stop(prefix)
+        self.start()
+        return None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.samples[';'.join(reversed(stack))] += 1
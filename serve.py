@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""生产环境Web服务入口：多进程 + 每进程有界线程池
+
+主进程只负责监听端口和管理工作进程，工作进程在fork之后才导入 web_server，
+因此重载时会加载新代码。每个工作进程用固定大小的线程池处理连接，线程全部占用时
+新连接留在内核监听队列中，不会无限制地创建线程。
+
+信号：
+    SIGHUP   平滑重载：先启动新一代工作进程，再让旧进程处理完当前请求后退出
+    SIGTERM  平滑停止（SIGINT 同）
+    SIGUSR1  转发给所有工作进程，切换性能剖析（工作进程收到 POST /api/profile 时也向主进程发送该信号）
+
+示例:
+    python3 serve.py --workers 4 --threads 8
+    TEMPERATURE_WEB_WORKERS=4 python3 serve.py
+"""
+import argparse
+import io
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from instrumentation import clear_worker_timings
+
+logger = logging.getLogger(__name__)
+
+# 默认配置，均可通过同名环境变量或命令行参数覆盖
+DEFAULT_CONFIG = {
+    'host': ('TEMPERATURE_WEB_HOST', '0.0.0.0'),
+    'port': ('TEMPERATURE_WEB_PORT', 5000),
+    'workers': ('TEMPERATURE_WEB_WORKERS', os.cpu_count() or 1),
+    'threads': ('TEMPERATURE_WEB_THREADS', 8),
+    'keepalive': ('TEMPERATURE_WEB_KEEPALIVE', 5.0),
+    'timeout': ('TEMPERATURE_WEB_TIMEOUT', 30.0),
+    'graceful_timeout': ('TEMPERATURE_WEB_GRACEFUL_TIMEOUT', 30.0),
+}
+
+# 工作进程启动后不足该秒数即退出时，重启前等待，避免代码错误导致频繁fork
+WORKER_RESTART_DELAY = 1.0
+
+def load_config():
+    """读取环境变量中的服务配置，类型与默认值一致"""
+    config = {}
+    for key, (env_name, default) in DEFAULT_CONFIG.items():
+        value = os.environ.get(env_name)
+        config[key] = type(default)(value) if value is not None else default
+    return config
+
+class PooledRequestHandler(WSGIRequestHandler):
+    """支持keep-alive的请求处理器
+
+    等待连接上的下一个请求时使用 keepalive 超时，请求开始后读写套接字使用 timeout 超时。
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def handle(self):
+        self.requests_handled = 0
+        self.keep_alive = False
+        super().handle()
+
+    def handle_one_request(self):
+        server = self.server
+        if self.requests_handled and (server.keepalive <= 0 or server.draining):
+            self.close_connection = True
+            return
+
+        self.connection.settimeout(server.keepalive if self.requests_handled else server.request_timeout)
+        if not self.rfile.peek(1):
+            self.close_connection = True
+            return
+
+        self.connection.settimeout(server.request_timeout)
+        self.requests_handled += 1
+        super().handle_one_request()
+
+    def run_wsgi(self):
+        # werkzeug 总是返回 Connection: close，并在响应后读取丢弃连接上的剩余数据；
+        # 对没有请求体的请求保持连接，丢弃时改为读取空流，不会吞掉同一连接上的下一个请求
+        self.keep_alive = (
+            not self.close_connection
+            and self.server.keepalive > 0
+            and not self.server.draining
+            and self.headers.get('Content-Length', '0') == '0'
+            and 'Transfer-Encoding' not in self.headers
+        )
+        if not self.keep_alive:
+            return super().run_wsgi()
+
+        rfile = self.rfile
+        self.rfile = io.BytesIO()
+        try:
+            super().run_wsgi()
+        finally:
+            self.rfile = rfile
+
+    def send_header(self, keyword, value):
+        if keyword.lower() == 'connection' and self.keep_alive:
+            value = 'keep-alive'
+        super().send_header(keyword, value)
+
+class PooledWSGIServer(BaseWSGIServer):
+    """使用有界线程池处理连接的WSGI服务器"""
+    multithread = True
+
+    def __init__(self, host, app, fd, threads, keepalive, request_timeout):
+        super().__init__(host, 0, app, handler=PooledRequestHandler, fd=fd)
+        self.keepalive = keepalive
+        self.request_timeout = request_timeout
+        self.draining = False
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='http')
+        self.slots = threading.BoundedSemaphore(threads)
+
+    def process_request(self, request, client_address):
+        # 线程全部占用时在此等待，期间不再accept新连接
+        self.slots.acquire()
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def drain(self):
+        """停止接受新连接，等待正在处理的请求完成"""
+        self.draining = True
+        self.shutdown()
+        self.pool.shutdown(wait=True)
+
+def run_worker(listener, config):
+    """工作进程主函数（fork之后执行）"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    # 在fork之后导入，使重载后的工作进程加载最新代码
+    from web_server import app, flush_worker_stats, init_worker, warm_caches
+    init_worker(master_pid=os.getppid())
+    warm_caches()
+
+    server = PooledWSGIServer(config['host'], app, listener.fileno(), config['threads'], config['keepalive'], config['timeout'])
+    listener.close()
+
+    def handle_term(signum, frame):
+        threading.Thread(target=server.drain, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, handle_term)
+    logger.info(f"Worker {os.getpid()} serving with {config['threads']} threads")
+    server.serve_forever()
+    server.pool.shutdown(wait=True)
+    flush_worker_stats()
+
+class Master:
+    """监听端口并管理工作进程"""
+
+    def __init__(self, config):
+        self.config = config
+        self.workers = {}  # pid -> (代数, 启动时间)
+        self.generation = 0
+        self.pending = []
+        self.stopping = False
+
+        self.listener = socket.create_server((config['host'], config['port']), backlog=2048)
+        self.listener.set_inheritable(True)
+
+    def spawn_worker(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(self.listener, self.config)
+            except Exception:
+                logger.exception("Worker failed")
+                code = 1
+            finally:
+                logging.shutdown()
+                os._exit(code)
+        self.workers[pid] = (self.generation, time.monotonic())
+
+    def spawn_generation(self):
+        self.generation += 1
+        for _ in range(self.config['workers']):
+            self.spawn_worker()
+
+    def signal_workers(self, signum, generation=None):
+        for pid, (worker_generation, _) in list(self.workers.items()):
+            if generation is None or worker_generation < generation:
+                try:
+                    os.kill(pid, signum)
+                except ProcessLookupError:
+                    pass
+
+    def reload(self):
+        """新一代工作进程开始接受连接后，旧进程处理完当前请求即退出；监听端口始终保持打开"""
+        logger.info("Reloading workers")
+        self.spawn_generation()
+        self.signal_workers(signal.SIGTERM, generation=self.generation)
+
+    def reap_workers(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            generation, started = self.workers.pop(pid, (None, None))
+            if generation != self.generation or self.stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            logger.warning(f"Worker {pid} exited with status {code}, restarting")
+            if time.monotonic() - started < WORKER_RESTART_DELAY:
+                time.sleep(WORKER_RESTART_DELAY)
+            self.spawn_worker()
+
+    def stop(self):
+        """通知所有工作进程平滑退出，超过 graceful_timeout 仍未退出的强制结束"""
+        self.stopping = True
+        self.signal_workers(signal.SIGTERM)
+        deadline = time.monotonic() + self.config['graceful_timeout']
+        while self.workers and time.monotonic() < deadline:
+            self.reap_workers()
+            time.sleep(0.1)
+        if self.workers:
+            logger.warning(f"Killing {len(self.workers)} workers after graceful timeout")
+            self.signal_workers(signal.SIGKILL)
+            while self.workers:
+                pid, _ = os.wait()
+                self.workers.pop(pid, None)
+        self.listener.close()
+
+    def run(self):
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGUSR1):
+            signal.signal(signum, lambda signum, frame: self.pending.append(signum))
+
+        host, port = self.listener.getsockname()[:2]
+        logger.info(f"Serving on http://{host}:{port} with {self.config['workers']} workers (master PID {os.getpid()})")
+        # /api/stats 合并的是本次启动以来各工作进程（含已退出的）的统计
+        clear_worker_timings()
+        self.spawn_generation()
+
+        while True:
+            while self.pending:
+                signum = self.pending.pop(0)
+                if signum == signal.SIGHUP:
+                    self.reload()
+                elif signum == signal.SIGUSR1:
+                    self.signal_workers(signal.SIGUSR1)
+                else:
+                    self.stop()
+                    return
+            self.reap_workers()
+            time.sleep(0.2)
+
+def main():
+    config = load_config()
+    parser = argparse.ArgumentParser(description='Serve the temperature monitor web interface with multiple workers')
+    parser.add_argument('--host', default=config['host'])
+    parser.add_argument('--port', type=int, default=config['port'])
+    parser.add_argument('--workers', type=int, default=config['workers'], help='worker processes')
+    parser.add_argument('--threads', type=int, default=config['threads'], help='request threads per worker')
+    parser.add_argument('--keepalive', type=float, default=config['keepalive'],
+                        help='seconds to wait for the next request on a connection (0 disables keep-alive)')
+    parser.add_argument('--timeout', type=float, default=config['timeout'], help='socket read/write timeout per request')
+    parser.add_argument('--graceful-timeout', type=float, default=config['graceful_timeout'],
+                        help='seconds to wait for in-flight requests on stop/reload')
+    config = vars(parser.parse_args())
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    Master(config).run()
+
+if __name__ == "__main__":
+    main()
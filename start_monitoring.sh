@@ -6,15 +6,14 @@ cd "$SCRIPT_DIR"
 
 echo "Starting Temperature Monitoring System..."
 
-# 初始化数据库（如果还没有初始化）
-if [ ! -f "temperature_monitor.db" ]; then
-    echo "Initializing database..."
-    python3 init_db.py
-fi
+# 初始化数据库（建表与索引均为幂等操作，已有数据库会补齐新索引）
+echo "Initializing database..."
+python3 init_db.py
 
 # 设置权限
 chmod +x temperature_collector.py
 chmod +x web_server.py
+chmod +x serve.py
 
 # 先收集一次数据
 echo "Collecting initial temperature data..."
@@ -32,9 +31,9 @@ echo "Starting temperature collection service (every 60 seconds)..."
 COLLECTOR_PID=$!
 echo "Temperature collector started with PID: $COLLECTOR_PID"
 
-# 启动Web服务器
+# 启动Web服务器（多进程，工作进程数等配置见 serve.py 中的 TEMPERATURE_WEB_* 环境变量）
 echo "Starting web server on http://localhost:5000..."
-python3 web_server.py &
+python3 serve.py &
 
 WEB_PID=$!
 echo "Web server started with PID: $WEB_PID"
@@ -22,6 +22,11 @@ if [ -f "web.pid" ]; then
     if kill -0 $WEB_PID 2>/dev/null; then
         echo "Stopping web server (PID: $WEB_PID)..."
         kill $WEB_PID
+        # 等待工作进程处理完当前请求
+        for i in $(seq 1 30); do
+            kill -0 $WEB_PID 2>/dev/null || break
+            sleep 1
+        done
         rm web.pid
     fi
 fi
@@ -29,5 +34,6 @@ fi
 # 清理其他可能的进程
 pkill -f "temperature_collector.py"
 pkill -f "web_server.py"
+pkill -f "python3 serve.py"
 
 echo "✅ Temperature monitoring system stopped."
\ No newline at end of file
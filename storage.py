@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""温度数据存储后端
+
+采集器与Web服务器通过统一接口读写温度数据：
+- write_batch(readings, timestamp=None): 写入一批读数
+- query_range(start, end=None, sensors=None): 时间范围内的读数，按时间升序
+- latest(): 每个传感器的最新读数，按传感器名排序
+- stats(start, end=None): 时间范围内的读数数量、平均/最高/最低温度
+
+时间统一使用数据库中的本地时间字符串格式 'YYYY-MM-DD HH:MM:SS'。
+"""
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from functools import lru_cache
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# 采集器每次运行后原子写出的最新温度快照，Web服务器的 /metrics 与首页直接读取，无需查询数据库
+LATEST_SNAPSHOT_FILE = 'latest_temperatures.json'
+
+# 预聚合表的时间粒度（秒）。写入原始数据时同步累加，分析接口在此基础上按更粗的时间桶对齐
+ROLLUP_SECONDS = 300
+ROLLUP_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS temperature_rollups (
+        bucket INTEGER NOT NULL,
+        sensor_name TEXT NOT NULL,
+        reading_count INTEGER NOT NULL,
+        temp_sum REAL NOT NULL,
+        temp_min REAL NOT NULL,
+        temp_max REAL NOT NULL,
+        PRIMARY KEY (bucket, sensor_name)
+    ) WITHOUT ROWID
+'''
+
+# 环形缓冲后端默认保留的时长与采样间隔（决定每个传感器的固定容量）
+RING_BUFFER_HOURS = 168
+RING_BUFFER_INTERVAL = 60
+
+def format_timestamp(epoch):
+    return _format_timestamp(int(epoch))
+
+@lru_cache(maxsize=65536)
+def _format_timestamp(epoch):
+    # 同一次采集的所有传感器共享时间戳，缓存可避免重复格式化
+    return time.strftime(TIMESTAMP_FORMAT, time.localtime(epoch))
+
+@lru_cache(maxsize=65536)
+def parse_timestamp(value):
+    return datetime.strptime(value, TIMESTAMP_FORMAT).timestamp()
+
+def now_timestamp():
+    return datetime.now().strftime(TIMESTAMP_FORMAT)
+
+@lru_cache(maxsize=65536)
+def naive_epoch(value):
+    """把本地时间字符串按UTC换算为秒数，与SQLite的 strftime('%s', timestamp) 一致"""
+    return int(datetime.strptime(value, TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc).timestamp())
+
+def format_naive_epoch(epoch):
+    return time.strftime(TIMESTAMP_FORMAT, time.gmtime(epoch))
+
+def rollup_bucket(value):
+    return naive_epoch(value) // ROLLUP_SECONDS * ROLLUP_SECONDS
+
+class StorageBackend(ABC):
+    """存储后端接口，缺少任一方法的子类在实例化时即报错"""
+
+    @abstractmethod
+    def write_batch(self, readings, timestamp=None):
+        """写入一批读数"""
+
+    @abstractmethod
+    def query_range(self, start, end=None, sensors=None):
+        """时间范围内的读数，按时间升序"""
+
+    @abstractmethod
+    def latest(self):
+        """每个传感器的最新读数，按传感器名排序"""
+
+    @abstractmethod
+    def stats(self, start, end=None):
+        """时间范围内的读数数量、平均/最高/最低温度"""
+
+class SQLiteBackend(StorageBackend):
+    """基于 temperature_readings 表的SQLite后端，每次调用使用独立连接"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def write_batch(self, readings, timestamp=None):
+        timestamp = timestamp or now_timestamp()
+        bucket = rollup_bucket(timestamp)
+        conn = self._connect()
+        try:
+            conn.executemany('''
+                INSERT INTO temperature_readings (timestamp, sensor_name, temperature, unit)
+                VALUES (?, ?, ?, ?)
+            ''', [(timestamp, r['sensor_name'], r['temperature'], r['unit']) for r in readings])
+            
+            # 同一事务内累加预聚合，建表语句保证旧数据库未重新运行 init_db.py 时也能写入
+            conn.execute(ROLLUP_SCHEMA)
+            conn.executemany('''
+                INSERT INTO temperature_rollups (bucket, sensor_name, reading_count, temp_sum, temp_min, temp_max)
+                VALUES (?, ?, 1, ?, ?, ?)
+                ON CONFLICT (bucket, sensor_name) DO UPDATE SET
+                    reading_count = reading_count + 1,
+                    temp_sum = temp_sum + excluded.temp_sum,
+                    temp_min = MIN(temp_min, excluded.temp_min),
+                    temp_max = MAX(temp_max, excluded.temp_max)
+            ''', [(bucket, r['sensor_name'], r['temperature'], r['temperature'], r['temperature']) for r in readings])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def query_range(self, start, end=None, sensors=None):
+        conditions = ['timestamp >= ?']
+        params = [start]
+        if end:
+            conditions.append('timestamp <= ?')
+            params.append(end)
+        if sensors:
+            conditions.append('sensor_name IN ({})'.format(','.join('?' * len(sensors))))
+            params.extend(sensors)
+
+        conn = self._connect()
+        try:
+            cursor = conn.execute('''
+                SELECT sensor_name, temperature, timestamp
+                FROM temperature_readings
+                WHERE {}
+                ORDER BY timestamp ASC
+            '''.format(' AND '.join(conditions)), params)
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    def rows_after(self, after_id, start=None):
+        """id 大于 after_id（且时间不早于 start）的读数，按 id 升序，供其他后端增量同步"""
+        conditions = ['id > ?']
+        params = [after_id]
+        if start:
+            conditions.append('timestamp >= ?')
+            params.append(start)
+
+        conn = self._connect()
+        try:
+            cursor = conn.execute('''
+                SELECT id, sensor_name, temperature, unit, timestamp
+                FROM temperature_readings
+                WHERE {}
+                ORDER BY id ASC
+            '''.format(' AND '.join(conditions)), params)
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    def latest(self):
+        # 递归CTE逐个跳到下一个传感器名，再用 (sensor_name, timestamp) 索引取最新时间，
+        # 代价与传感器数量成正比，而不是与总行数成正比
+        conn = self._connect()
+        try:
+            cursor = conn.execute('''
+                WITH RECURSIVE sensors(name) AS (
+                    SELECT MIN(sensor_name) FROM temperature_readings
+                    UNION ALL
+                    SELECT (
+                        SELECT MIN(sensor_name) FROM temperature_readings
+                        WHERE sensor_name > sensors.name
+                    )
+                    FROM sensors WHERE sensors.name IS NOT NULL
+                )
+                SELECT t.sensor_name, t.temperature, t.timestamp
+                FROM sensors
+                JOIN temperature_readings t ON t.sensor_name = sensors.name
+                WHERE t.timestamp = (
+                    SELECT MAX(timestamp)
+                    FROM temperature_readings t2
+                    WHERE t2.sensor_name = sensors.name
+                )
+                ORDER BY t.sensor_name
+            ''')
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    def stats(self, start, end=None):
+        conditions = ['timestamp >= ?']
+        params = [start]
+        if end:
+            conditions.append('timestamp <= ?')
+            params.append(end)
+
+        conn = self._connect()
+        try:
+            cursor = conn.execute('''
+                SELECT
+                    COUNT(*) as total_readings,
+                    AVG(temperature) as avg_temp,
+                    MAX(temperature) as max_temp,
+                    MIN(temperature) as min_temp
+                FROM temperature_readings
+                WHERE {}
+            '''.format(' AND '.join(conditions)), params)
+            return dict(cursor.fetchone())
+        finally:
+            conn.close()
+
+    def query_rollups(self, start, end, bucket_seconds, sensors=None, min_peak=None):
+        """按 bucket_seconds（ROLLUP_SECONDS 的整数倍）聚合预聚合表
+
+        返回 (bucket, sensor_name, 平均温度, 最高温度)，bucket 为 naive_epoch 秒数。
+        指定 min_peak 时只统计最高温度超过该值的原生时间桶。
+        """
+        conditions = ['bucket >= ?', 'bucket < ?']
+        params = [bucket_seconds, bucket_seconds, rollup_bucket(start), naive_epoch(end)]
+        if sensors:
+            conditions.append('sensor_name IN ({})'.format(','.join('?' * len(sensors))))
+            params.extend(sensors)
+        if min_peak is not None:
+            conditions.append('temp_max > ?')
+            params.append(min_peak)
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.execute('''
+                SELECT bucket / ? * ? AS slot, sensor_name,
+                       SUM(temp_sum) / SUM(reading_count), MAX(temp_max)
+                FROM temperature_rollups
+                WHERE {}
+                GROUP BY slot, sensor_name
+            '''.format(' AND '.join(conditions)), params)
+            return cursor.fetchall()
+        finally:
+            conn.close()
+
+class _SensorRing:
+    """单个传感器的定长环形缓冲，时间与温度分别存放在 array('d') 中"""
+
+    def __init__(self, capacity, unit):
+        self.capacity = capacity
+        self.unit = unit
+        self.times = array('d', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        self.start = 0
+        self.size = 0
+
+    def append(self, epoch, value):
+        if self.size < self.capacity:
+            index = (self.start + self.size) % self.capacity
+            self.size += 1
+        else:
+            index = self.start
+            self.start = (self.start + 1) % self.capacity
+        self.times[index] = epoch
+        self.values[index] = value
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        # 按逻辑位置返回时间，供 bisect 在环形缓冲上二分查找
+        return self.times[(self.start + i) % self.capacity]
+
+    def segments(self, lo, hi):
+        """逻辑区间 [lo, hi) 对应的物理区间（环绕时为两段）"""
+        if lo >= hi:
+            return []
+        first = (self.start + lo) % self.capacity
+        last = first + (hi - lo)
+        if last <= self.capacity:
+            return [(first, last)]
+        return [(first, self.capacity), (0, last - self.capacity)]
+
+    def window(self, start_epoch, end_epoch):
+        lo = bisect_left(self, start_epoch)
+        hi = bisect_right(self, end_epoch) if end_epoch is not None else self.size
+        return self.segments(lo, hi)
+
+class RingBufferBackend(StorageBackend):
+    """内存环形缓冲后端
+
+    每个传感器预分配固定容量（保留时长 / 采样间隔），内存占用固定，查询不涉及磁盘I/O。
+    同一传感器的读数需按时间顺序写入。
+    """
+
+    def __init__(self, hours=RING_BUFFER_HOURS, interval=RING_BUFFER_INTERVAL):
+        self.capacity = int(hours * 3600 // interval) + 1
+        self.rings = {}
+        self.lock = threading.Lock()
+        # 已从SQLite同步到的最大行id
+        self.last_id = 0
+        self.sync_lock = threading.Lock()
+
+    def _append(self, sensor_name, epoch, value, unit):
+        ring = self.rings.get(sensor_name)
+        if ring is None:
+            ring = self.rings[sensor_name] = _SensorRing(self.capacity, unit)
+        ring.append(epoch, value)
+
+    def write_batch(self, readings, timestamp=None):
+        epoch = parse_timestamp(timestamp) if timestamp else float(int(time.time()))
+        with self.lock:
+            for r in readings:
+                self._append(r['sensor_name'], epoch, r['temperature'], r['unit'])
+
+    def sync_from(self, backend, start=None):
+        """追加SQLite后端中 last_id 之后写入的所有读数，返回追加的行数
+
+        按行id而不是最新快照同步，两次同步之间采集器写入多少次都不会遗漏。
+        """
+        with self.sync_lock:
+            rows = backend.rows_after(self.last_id, start)
+            with self.lock:
+                for row in rows:
+                    self._append(row['sensor_name'], parse_timestamp(row['timestamp']), row['temperature'], row['unit'])
+            if rows:
+                self.last_id = rows[-1]['id']
+        return len(rows)
+
+    def query_range(self, start, end=None, sensors=None):
+        start_epoch = parse_timestamp(start)
+        end_epoch = parse_timestamp(end) if end else None
+        names = sensors if sensors else self.rings.keys()
+
+        rows = []
+        with self.lock:
+            for name in names:
+                ring = self.rings.get(name)
+                if ring is None:
+                    continue
+                for lo, hi in ring.window(start_epoch, end_epoch):
+                    rows.extend(
+                        (epoch, name, value)
+                        for epoch, value in zip(ring.times[lo:hi], ring.values[lo:hi])
+                    )
+        rows.sort(key=lambda row: row[0])
+        return [
+            {'sensor_name': name, 'temperature': value, 'timestamp': format_timestamp(epoch)}
+            for epoch, name, value in rows
+        ]
+
+    def latest(self):
+        current = []
+        with self.lock:
+            for name in sorted(self.rings):
+                ring = self.rings[name]
+                if ring.size:
+                    index = (ring.start + ring.size - 1) % ring.capacity
+                    current.append({
+                        'sensor_name': name,
+                        'temperature': ring.values[index],
+                        'timestamp': format_timestamp(ring.times[index])
+                    })
+        return current
+
+    def stats(self, start, end=None):
+        start_epoch = parse_timestamp(start)
+        end_epoch = parse_timestamp(end) if end else None
+        count = 0
+        total = 0.0
+        max_temp = None
+        min_temp = None
+
+        with self.lock:
+            for ring in self.rings.values():
+                for lo, hi in ring.window(start_epoch, end_epoch):
+                    values = ring.values[lo:hi]
+                    count += len(values)
+                    total += sum(values)
+                    max_temp = max(values) if max_temp is None else max(max_temp, max(values))
+                    min_temp = min(values) if min_temp is None else min(min_temp, min(values))
+
+        return {
+            'total_readings': count,
+            'avg_temp': total / count if count else None,
+            'max_temp': max_temp,
+            'min_temp': min_temp
+        }
+
+BACKENDS = ('sqlite', 'ringbuffer')
+
+def create_backend(name, db_path, warm_hours=RING_BUFFER_HOURS):
+    """按名称创建存储后端；环形缓冲后端会先从SQLite预热最近 warm_hours 小时的数据"""
+    if name == 'sqlite':
+        return SQLiteBackend(db_path)
+    if name == 'ringbuffer':
+        backend = RingBufferBackend(hours=warm_hours)
+        start = format_timestamp(time.time() - warm_hours * 3600)
+        backend.sync_from(SQLiteBackend(db_path), start)
+        return backend
+    raise ValueError(f"unknown storage backend: {name}")
@@ -8,9 +8,17 @@ import logging
 import os
 import time
 
+from instrumentation import (
+    COLLECTOR_STATS_FILE, begin_trace, end_trace, format_trace, maybe_profile, save_timings, timed
+)
+from anomaly import detect_anomalies
+from storage import LATEST_SNAPSHOT_FILE, SQLiteBackend
+
 DB_PATH = 'temperature_monitor.db'
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# 热区域温度文件所在目录（基准测试中替换为伪造的sysfs目录）
+THERMAL_ROOT = '/sys/class/thermal'
+
 logger = logging.getLogger(__name__)
 
 # 温度告警阈值配置（摄氏度）
@@ -42,43 +50,46 @@ TEMPERATURE_THRESHOLDS = {
 # 告警冷却时间（秒），避免频繁通知
 ALERT_COOLDOWN = 300  # 5分钟
 
-def get_temperature_threshold(sensor_name):
-    """根据传感器名称获取对应的温度阈值"""
+def get_sensor_category(sensor_name):
+    """根据传感器名称获取其类别（即 TEMPERATURE_THRESHOLDS 中的键）"""
     sensor_lower = sensor_name.lower()
     
     # CPU温度
     if 'k10temp' in sensor_lower or 'cpu' in sensor_lower:
         if 'tctl' in sensor_lower:
-            return TEMPERATURE_THRESHOLDS['cpu_control']
+            return 'cpu_control'
         elif 'tccd' in sensor_lower or 'core' in sensor_lower:
-            return TEMPERATURE_THRESHOLDS['cpu_core']
+            return 'cpu_core'
         else:
-            return TEMPERATURE_THRESHOLDS['cpu_general']
+            return 'cpu_general'
     
     # GPU温度
     elif 'nvidia' in sensor_lower:
-        return TEMPERATURE_THRESHOLDS['gpu_nvidia']
+        return 'gpu_nvidia'
     elif 'amd' in sensor_lower and 'gpu' in sensor_lower:
-        return TEMPERATURE_THRESHOLDS['gpu_amd']
+        return 'gpu_amd'
     
     # 存储设备
     elif 'nvme' in sensor_lower:
-        return TEMPERATURE_THRESHOLDS['nvme_ssd']
+        return 'nvme_ssd'
     elif 'ssd' in sensor_lower:
-        return TEMPERATURE_THRESHOLDS['ssd_general']
+        return 'ssd_general'
     
     # 网络设备
     elif 'wifi' in sensor_lower or 'iwlwifi' in sensor_lower:
-        return TEMPERATURE_THRESHOLDS['network_wifi']
+        return 'network_wifi'
     elif 'ethernet' in sensor_lower or 'r8169' in sensor_lower:
-        return TEMPERATURE_THRESHOLDS['network_ethernet']
+        return 'network_ethernet'
     
     # 系统热区域
     elif 'thermal' in sensor_lower:
-        return TEMPERATURE_THRESHOLDS['system_thermal']
+        return 'system_thermal'
     
-    # 默认阈值
-    return TEMPERATURE_THRESHOLDS['default']
+    return 'default'
+
+def get_temperature_threshold(sensor_name):
+    """根据传感器名称获取对应的温度阈值"""
+    return TEMPERATURE_THRESHOLDS[get_sensor_category(sensor_name)]
 
 def send_system_notification(title, message, urgency='normal'):
     """发送Linux系统通知"""
@@ -150,8 +161,18 @@ def get_friendly_sensor_name_for_alert(sensor_name):
     
     return sensor_name.replace('_', ' ').title()
 
-def check_temperature_alerts(temperatures):
-    """检查温度告警并发送通知"""
+def is_in_cooldown(last_alert_time_str, current_time):
+    """上次告警是否仍在冷却时间内"""
+    if not last_alert_time_str:
+        return False
+    try:
+        last_alert_time = datetime.fromisoformat(last_alert_time_str)
+        return (current_time - last_alert_time).total_seconds() < ALERT_COOLDOWN
+    except:
+        return False
+
+def check_temperature_alerts(temperatures, anomalies=None):
+    """检查温度告警（固定阈值与基线异常）并发送通知"""
     current_time = datetime.now()
     alert_file = 'temperature_alerts.json'
     
@@ -176,15 +197,7 @@ def check_temperature_alerts(temperatures):
             last_alert_time_str = last_alerts.get(sensor_name)
             
             # 检查是否需要发送告警（冷却时间）
-            should_alert = True
-            if last_alert_time_str:
-                try:
-                    last_alert_time = datetime.fromisoformat(last_alert_time_str)
-                    time_diff = (current_time - last_alert_time).total_seconds()
-                    if time_diff < ALERT_COOLDOWN:
-                        should_alert = False
-                except:
-                    pass
+            should_alert = not is_in_cooldown(last_alert_time_str, current_time)
             
             if should_alert:
                 # 发送告警通知
@@ -208,6 +221,31 @@ def check_temperature_alerts(temperatures):
                 friendly_name = get_friendly_sensor_name_for_alert(sensor_name)
                 logger.info(f"Temperature normalized: {friendly_name} = {temperature:.1f}°C")
     
+    # 基线异常：尚未超过固定阈值，但明显高于该传感器自身的历史基线
+    for anomaly in anomalies or []:
+        sensor_name = anomaly['sensor_name']
+        if sensor_name in new_alerts:
+            # 已有阈值告警，不再重复通知
+            continue
+        
+        alert_key = f"{sensor_name}#anomaly"
+        last_alert_time_str = last_alerts.get(alert_key)
+        if is_in_cooldown(last_alert_time_str, current_time):
+            new_alerts[alert_key] = last_alert_time_str
+            continue
+        
+        temperature = anomaly['temperature']
+        friendly_name = get_friendly_sensor_name_for_alert(sensor_name)
+        title = f"📈 温度异常 - {friendly_name}"
+        message = (f"当前温度: {temperature:.1f}°C\n"
+                   f"基线温度: {anomaly['baseline']:.1f}°C (±{anomaly['stddev']:.1f}°C)\n"
+                   f"高于基线: {temperature - anomaly['baseline']:.1f}°C")
+        send_system_notification(title, message, 'normal')
+        
+        logger.warning(f"Temperature anomaly: {friendly_name} = {temperature:.1f}°C "
+                       f"(baseline: {anomaly['baseline']:.1f}°C, z={anomaly['zscore']:.1f})")
+        new_alerts[alert_key] = current_time.isoformat()
+    
     # 保存告警记录
     try:
         with open(alert_file, 'w') as f:
@@ -256,11 +294,11 @@ def parse_temperature_data(sensors_data):
     return temperatures
 
 def get_thermal_zone_data():
-    """从/sys/class/thermal获取温度数据"""
+    """从/sys/class/thermal（THERMAL_ROOT）获取温度数据"""
     temperatures = []
     
     try:
-        result = subprocess.run(['find', '/sys/class/thermal', '-name', 'temp', '-type', 'f'], 
+        result = subprocess.run(['find', THERMAL_ROOT, '-name', 'temp', '-type', 'f'], 
                               capture_output=True, text=True, check=True)
         
         for temp_file in result.stdout.strip().split('\n'):
@@ -291,22 +329,39 @@ def save_temperature_data(temperatures):
         return
     
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        for temp_data in temperatures:
-            cursor.execute('''
-                INSERT INTO temperature_readings (timestamp, sensor_name, temperature, unit)
-                VALUES (datetime('now', 'localtime'), ?, ?, ?)
-            ''', (temp_data['sensor_name'], temp_data['temperature'], temp_data['unit']))
-        
-        conn.commit()
-        conn.close()
+        SQLiteBackend(DB_PATH).write_batch(temperatures)
         logger.info(f"Saved {len(temperatures)} temperature readings")
         
     except sqlite3.Error as e:
         logger.error(f"Database error: {e}")
 
+def save_latest_snapshot(temperatures):
+    """将本次采集的最新温度写入快照文件
+
+    先写临时文件再原子替换，读取方不会看到写了一半的内容。
+    """
+    snapshot = {
+        'timestamp': time.time(),
+        'readings': [
+            {
+                'sensor_name': temp['sensor_name'],
+                'temperature': temp['temperature'],
+                'unit': temp['unit'],
+                'category': get_sensor_category(temp['sensor_name']),
+                'threshold': get_temperature_threshold(temp['sensor_name'])
+            }
+            for temp in temperatures
+        ]
+    }
+    
+    tmp_path = f"{LATEST_SNAPSHOT_FILE}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, LATEST_SNAPSHOT_FILE)
+    except OSError as e:
+        logger.error(f"Failed to save latest snapshot: {e}")
+
 def get_gpu_temperature():
     """获取NVIDIA GPU温度"""
     temperatures = []
@@ -357,37 +412,69 @@ def get_gpu_temperature():
 
 def collect_temperatures():
     """主函数：收集所有温度数据"""
+    begin_trace()
+    tick_start = time.perf_counter()
+    
+    with maybe_profile('collector'):
+        unique_temperatures = run_collection_stages()
+    
+    tick_ms = (time.perf_counter() - tick_start) * 1000
+    logger.info(format_trace('collector_tick', end_trace(), total_ms=round(tick_ms, 3), readings=len(unique_temperatures)))
+    
+    try:
+        save_timings(COLLECTOR_STATS_FILE)
+    except OSError as e:
+        logger.error(f"Failed to save collector timings: {e}")
+
+def run_collection_stages():
+    """依次执行采集、解析、去重、告警和写库各阶段，并记录每个阶段的耗时"""
     all_temperatures = []
     
     # 从sensors获取数据
-    sensors_data = get_sensors_data()
-    sensors_temps = parse_temperature_data(sensors_data)
+    with timed('collector.fetch.sensors'):
+        sensors_data = get_sensors_data()
+    with timed('collector.parse_temperature_data'):
+        sensors_temps = parse_temperature_data(sensors_data)
     all_temperatures.extend(sensors_temps)
     
     # 从thermal zones获取数据
-    thermal_temps = get_thermal_zone_data()
+    with timed('collector.fetch.thermal_zone'):
+        thermal_temps = get_thermal_zone_data()
     all_temperatures.extend(thermal_temps)
     
     # 获取GPU温度
-    gpu_temps = get_gpu_temperature()
+    with timed('collector.fetch.gpu'):
+        gpu_temps = get_gpu_temperature()
     all_temperatures.extend(gpu_temps)
     
     # 去重（相同传感器名称只保留一个）
-    seen_sensors = set()
-    unique_temperatures = []
-    for temp in all_temperatures:
-        if temp['sensor_name'] not in seen_sensors:
-            seen_sensors.add(temp['sensor_name'])
-            unique_temperatures.append(temp)
+    with timed('collector.dedupe'):
+        seen_sensors = set()
+        unique_temperatures = []
+        for temp in all_temperatures:
+            if temp['sensor_name'] not in seen_sensors:
+                seen_sensors.add(temp['sensor_name'])
+                unique_temperatures.append(temp)
     
     logger.info(f"Collected {len(unique_temperatures)} unique temperature readings")
     for temp in unique_temperatures:
         logger.info(f"{temp['sensor_name']}: {temp['temperature']:.1f}°{temp['unit']}")
     
+    # 更新基线并检测异常
+    with timed('collector.anomaly'):
+        anomalies = detect_anomalies(unique_temperatures, DB_PATH)
+    
     # 检查温度告警
-    check_temperature_alerts(unique_temperatures)
+    with timed('collector.alerts'):
+        check_temperature_alerts(unique_temperatures, anomalies)
+    
+    with timed('collector.db_write'):
+        save_temperature_data(unique_temperatures)
+    with timed('collector.snapshot'):
+        save_latest_snapshot(unique_temperatures)
     
-    save_temperature_data(unique_temperatures)
+    return unique_temperatures
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     collect_temperatures()
\ No newline at end of file
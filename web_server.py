@@ -1,11 +1,76 @@
 #!/usr/bin/env python3
-from flask import Flask, jsonify, render_template_string, request
+from flask import Flask, Response, jsonify, render_template_string, request, stream_with_context
 import sqlite3
 from datetime import datetime, timedelta
+import csv
+import gzip
+import hashlib
+import io
 import json
+import logging
+import math
+import os
+import signal
+import threading
+import time
+
+from assets import ASSET_MAX_AGE, VENDOR_ASSETS, load_assets
+from instrumentation import (
+    COLLECTOR_STATS_FILE, PROFILE_FLAG_FILE, WEB_STATS_DIR, SamplingProfiler, begin_trace, end_trace, format_trace,
+    get_timings, load_timings, load_worker_timings, merge_timings, timed, worker_stats_path, write_timings
+)
+from analysis import ANALYSIS_MAX_HOURS, ANALYSIS_MAX_LAG, analyze
+from storage import (
+    LATEST_SNAPSHOT_FILE, RingBufferBackend, SQLiteBackend, create_backend, format_timestamp, TIMESTAMP_FORMAT
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    # pyarrow为可选依赖，仅arrow格式导出需要
+    pa = None
 
 app = Flask(__name__)
 DB_PATH = 'temperature_monitor.db'
+logger = logging.getLogger(__name__)
+
+# 运行时可开关的采样剖析器（SIGUSR1 或 /api/profile）
+profiler = SamplingProfiler()
+
+# 由 serve.py 启动时为主进程PID，/api/profile 通知主进程转发给所有工作进程；
+# stats 为真时本进程定期把耗时直方图写入 WEB_STATS_DIR，供其他工作进程合并
+_worker = {'master_pid': None, 'stats': False}
+
+# 工作进程写出耗时直方图的间隔（秒）
+WORKER_STATS_INTERVAL = 5.0
+
+# 快照文件与 /metrics 响应缓存，仅在快照文件变化时重新读取/生成
+_snapshot_cache = {'mtime': None, 'snapshot': {}}
+_metrics_cache = {'mtime': None, 'body': None}
+
+# 存储后端：sqlite（默认）或 ringbuffer（内存环形缓冲，查询不访问磁盘）
+STORAGE_BACKEND = os.environ.get('TEMPERATURE_STORAGE', 'sqlite')
+_storage = {'backend': None, 'synced_at': 0.0}
+
+# 环形缓冲后端从SQLite增量同步的最小间隔（秒）
+RING_SYNC_INTERVAL = 1.0
+_storage_lock = threading.Lock()
+
+# 前端依赖的本地副本（内容哈希URL -> 预压缩内容），启动时读取一次
+ASSET_URLS, ASSET_FILES = load_assets()
+
+# 首页缓存：内嵌最新温度快照，仅在快照文件变化时重新渲染和压缩
+_page_cache = {'mtime': None, 'page': None}
+
+# 批量导出每次从游标读取的行数，内存占用与导出总量无关
+EXPORT_CHUNK_SIZE = 10000
+EXPORT_COLUMNS = ('id', 'timestamp', 'sensor_name', 'temperature', 'unit')
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'arrow': 'application/vnd.apache.arrow.stream'
+}
 
 def get_friendly_sensor_name(sensor_name):
     """将传感器技术名称转换为用户友好的名称"""
@@ -81,8 +146,8 @@ HTML_TEMPLATE = '''
 <html>
 <head>
     <title>Temperature Monitor</title>
-    <script src="https://cdn.jsdelivr.net/npm/chart.js@4.3.0/dist/chart.umd.js"></script>
-    <script src="https://cdn.jsdelivr.net/npm/chartjs-adapter-date-fns@3.0.0/dist/chartjs-adapter-date-fns.bundle.min.js"></script>
+    <script src="{{ assets['chart.js'] }}"></script>
+    <script src="{{ assets['chartjs-adapter-date-fns'] }}"></script>
     <style>
         body { font-family: Arial, sans-serif; margin: 20px; background: #f5f5f5; }
         .container { max-width: 1200px; margin: 0 auto; background: white; padding: 20px; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
@@ -154,8 +219,12 @@ HTML_TEMPLATE = '''
         let autoRefreshInterval;
         let autoRefreshEnabled = false;
         let selectedSensors = new Set(); // 选中的传感器
-        let allTemperatureData = []; // 存储所有温度数据
+        let sensorSeries = new Map(); // 传感器 -> 预解析的数据点 [{x: 毫秒时间戳, y: 温度}]
+        let sensorColors = new Map(); // 传感器 -> 固定的颜色序号
         let currentTemperatureData = []; // 存储当前温度数据
+        const tempCards = new Map(); // 传感器 -> 温度卡片DOM及其当前显示内容
+        const timestampCache = new Map(); // 时间字符串 -> 毫秒时间戳（同一次采集的传感器共享时间戳）
+        const initialCurrent = {{ initial_current|tojson }}; // 渲染页面时内嵌的最新温度，首次绘制无需等待API
 
         function initChart() {
             const ctx = document.getElementById('temperatureChart').getContext('2d');
@@ -167,6 +236,10 @@ HTML_TEMPLATE = '''
                 options: {
                     responsive: true,
                     maintainAspectRatio: false,
+                    // 数据已是内部格式 {x: 毫秒, y: 温度}，跳过解析，并允许抽稀插件工作
+                    parsing: false,
+                    normalized: true,
+                    animation: false,
                     scales: {
                         x: {
                             type: 'time',
@@ -184,14 +257,27 @@ HTML_TEMPLATE = '''
                             }
                         }
                     },
+                    interaction: {
+                        mode: 'nearest',
+                        axis: 'x',
+                        intersect: false
+                    },
                     plugins: {
+                        decimation: {
+                            enabled: true,
+                            algorithm: 'lttb',
+                            samples: 500
+                        },
                         legend: {
                             display: true,
-                            position: 'top'
+                            position: 'top',
+                            labels: {
+                                // 只显示选中的传感器
+                                filter: (item, data) => !data.datasets[item.datasetIndex].hidden
+                            },
+                            onClick: (event, item) => toggleSensor(chart.data.datasets[item.datasetIndex].label)
                         },
                         tooltip: {
-                            mode: 'index',
-                            intersect: false,
                             callbacks: {
                                 title: function(context) {
                                     // 显示时间
@@ -225,17 +311,34 @@ HTML_TEMPLATE = '''
             return colors[index % colors.length];
         }
 
+        function getSensorColor(sensorKey) {
+            if (!sensorColors.has(sensorKey)) {
+                sensorColors.set(sensorKey, sensorColors.size);
+            }
+            return getRandomColor(sensorColors.get(sensorKey));
+        }
+
+        function parseTimestamp(timestamp) {
+            let value = timestampCache.get(timestamp);
+            if (value === undefined) {
+                // "YYYY-MM-DD HH:MM:SS" 按本地时间解析
+                value = Date.parse(timestamp.replace(' ', 'T'));
+                timestampCache.set(timestamp, value);
+            }
+            return value;
+        }
+
         async function loadTemperatureData() {
             const timeRange = document.getElementById('timeRange').value;
             try {
                 const response = await fetch(`/api/temperatures?hours=${timeRange}`);
                 const data = await response.json();
                 
-                // 存储数据
-                allTemperatureData = data.data;
+                // 按传感器分组并预解析时间，之后切换显示不再遍历原始数据
+                buildSensorSeries(data.data);
                 currentTemperatureData = data.current;
                 
-                updateChart();
+                syncDatasets();
                 updateStats(data.stats);
                 updateCurrentTemps();
             } catch (error) {
@@ -243,37 +346,56 @@ HTML_TEMPLATE = '''
             }
         }
 
-        function updateChart() {
-            const datasets = {};
+        function buildSensorSeries(readings) {
+            const series = new Map();
+            timestampCache.clear();
             
-            // 只显示选中的传感器数据
-            const filteredData = allTemperatureData.filter(reading => {
+            for (const reading of readings) {
                 const key = reading.friendly_name || reading.sensor_name;
-                return selectedSensors.has(key);
-            });
+                let entry = series.get(key);
+                if (!entry) {
+                    entry = { originalName: reading.sensor_name, points: [] };
+                    series.set(key, entry);
+                }
+                entry.points.push({ x: parseTimestamp(reading.timestamp), y: reading.temperature });
+            }
             
-            filteredData.forEach(reading => {
-                const key = reading.friendly_name || reading.sensor_name;
-                if (!datasets[key]) {
-                    const colorIndex = Object.keys(datasets).length;
-                    datasets[key] = {
+            sensorSeries = series;
+        }
+
+        function syncDatasets() {
+            // 复用已有数据集，只替换数据，颜色与显示状态保持不变
+            const existing = new Map(chart.data.datasets.map(dataset => [dataset.label, dataset]));
+            const datasets = [];
+            
+            sensorSeries.forEach((entry, key) => {
+                let dataset = existing.get(key);
+                if (!dataset) {
+                    const color = getSensorColor(key);
+                    dataset = {
                         label: key,
                         data: [],
-                        borderColor: getRandomColor(colorIndex),
-                        backgroundColor: getRandomColor(colorIndex) + '20',
+                        borderColor: color,
+                        backgroundColor: color + '20',
                         fill: false,
-                        originalName: reading.sensor_name // 保存原始名称用于tooltip
+                        originalName: entry.originalName // 保存原始名称用于tooltip
                     };
                 }
-                
-                datasets[key].data.push({
-                    x: new Date(reading.timestamp),
-                    y: reading.temperature
-                });
+                dataset.data = entry.points;
+                dataset.hidden = !selectedSensors.has(key);
+                datasets.push(dataset);
             });
             
-            chart.data.datasets = Object.values(datasets);
-            chart.update();
+            chart.data.datasets = datasets;
+            chart.update('none');
+        }
+
+        function updateChart() {
+            // 只切换数据集的可见性，不重新构建数据
+            chart.data.datasets.forEach(dataset => {
+                dataset.hidden = !selectedSensors.has(dataset.label);
+            });
+            chart.update('none');
         }
 
         function updateStats(stats) {
@@ -302,42 +424,88 @@ HTML_TEMPLATE = '''
             }
         }
 
+        function createTempCard(sensorKey) {
+            const tempCard = document.createElement('div');
+            tempCard.className = 'temp-card';
+            tempCard.dataset.sensorKey = sensorKey;
+            tempCard.innerHTML = `
+                <div class="temp-name"></div>
+                <div class="temp-value"></div>
+                <div class="temp-name temp-time"></div>
+            `;
+            tempCard.querySelector('.temp-name').textContent = sensorKey;
+            
+            // 添加点击事件
+            tempCard.addEventListener('click', () => toggleSensor(sensorKey));
+            
+            const entry = {
+                card: tempCard,
+                value: tempCard.querySelector('.temp-value'),
+                time: tempCard.querySelector('.temp-time'),
+                temperature: null,
+                timestamp: null,
+                originalName: null
+            };
+            tempCards.set(sensorKey, entry);
+            return entry;
+        }
+
         function updateCurrentTemps() {
+            // 只更新内容有变化的卡片，不重建DOM
             const container = document.getElementById('currentTemps');
-            container.innerHTML = '';
+            const seen = new Set();
             
             currentTemperatureData.forEach(temp => {
                 const sensorKey = temp.friendly_name || temp.sensor_name;
-                const tempCard = document.createElement('div');
+                seen.add(sensorKey);
                 
-                // 设置基本样式和选中状态
-                tempCard.className = selectedSensors.has(sensorKey) ? 'temp-card selected' : 'temp-card';
-                tempCard.title = `原始名称: ${temp.sensor_name}\n点击切换图表显示`; // 鼠标悬停显示原始名称
-                tempCard.dataset.sensorKey = sensorKey;
-                
-                tempCard.innerHTML = `
-                    <div class="temp-name">${sensorKey}</div>
-                    <div class="temp-value">${temp.temperature.toFixed(1)}°C</div>
-                    <div class="temp-name">${new Date(temp.timestamp).toLocaleTimeString()}</div>
-                `;
-                
-                // 添加点击事件
-                tempCard.addEventListener('click', () => toggleSensor(sensorKey, tempCard));
+                let entry = tempCards.get(sensorKey);
+                if (!entry) {
+                    entry = createTempCard(sensorKey);
+                    container.appendChild(entry.card);
+                }
                 
-                container.appendChild(tempCard);
+                if (entry.temperature !== temp.temperature) {
+                    entry.value.textContent = `${temp.temperature.toFixed(1)}°C`;
+                    entry.temperature = temp.temperature;
+                }
+                if (entry.timestamp !== temp.timestamp) {
+                    entry.time.textContent = new Date(parseTimestamp(temp.timestamp)).toLocaleTimeString();
+                    entry.timestamp = temp.timestamp;
+                }
+                if (entry.originalName !== temp.sensor_name) {
+                    entry.card.title = `原始名称: ${temp.sensor_name}\n点击切换图表显示`; // 鼠标悬停显示原始名称
+                    entry.originalName = temp.sensor_name;
+                }
+                entry.card.classList.toggle('selected', selectedSensors.has(sensorKey));
+            });
+            
+            tempCards.forEach((entry, sensorKey) => {
+                if (!seen.has(sensorKey)) {
+                    entry.card.remove();
+                    tempCards.delete(sensorKey);
+                }
+            });
+        }
+        
+        function updateCardSelection() {
+            tempCards.forEach((entry, sensorKey) => {
+                entry.card.classList.toggle('selected', selectedSensors.has(sensorKey));
             });
         }
         
-        function toggleSensor(sensorKey, cardElement) {
+        function toggleSensor(sensorKey) {
             if (selectedSensors.has(sensorKey)) {
                 selectedSensors.delete(sensorKey);
-                cardElement.classList.remove('selected');
             } else {
                 selectedSensors.add(sensorKey);
-                cardElement.classList.add('selected');
             }
             
-            updateChart(); // 重新渲染图表
+            const entry = tempCards.get(sensorKey);
+            if (entry) {
+                entry.card.classList.toggle('selected', selectedSensors.has(sensorKey));
+            }
+            updateChart();
         }
 
         function refreshData() {
@@ -364,19 +532,23 @@ HTML_TEMPLATE = '''
                 const sensorKey = temp.friendly_name || temp.sensor_name;
                 selectedSensors.add(sensorKey);
             });
-            updateCurrentTemps(); // 重新渲染卡片状态
-            updateChart(); // 重新渲染图表
+            updateCardSelection();
+            updateChart();
         }
         
         function clearSelection() {
             selectedSensors.clear();
-            updateCurrentTemps(); // 重新渲染卡片状态
-            updateChart(); // 重新渲染图表
+            updateCardSelection();
+            updateChart();
         }
 
         // Initialize
         document.addEventListener('DOMContentLoaded', function() {
             initChart();
+            if (initialCurrent.length) {
+                currentTemperatureData = initialCurrent;
+                updateCurrentTemps();
+            }
             loadTemperatureData();
             
             // Set up event listeners
@@ -389,62 +561,36 @@ HTML_TEMPLATE = '''
 
 def get_temperature_data(hours=24):
     """获取指定时间范围内的温度数据"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    storage = get_storage()
+    start = (datetime.now() - timedelta(hours=hours)).strftime(TIMESTAMP_FORMAT)
     
     # 获取历史数据
-    cursor.execute('''
-        SELECT sensor_name, temperature, timestamp
-        FROM temperature_readings
-        WHERE timestamp >= datetime('now', 'localtime', '-{} hours')
-        ORDER BY timestamp ASC
-    '''.format(hours))
-    
-    raw_data = [dict(row) for row in cursor.fetchall()]
+    with timed('api.query.history'):
+        raw_data = storage.query_range(start)
     
     # 为每条记录添加友好名称
-    data = []
-    for row in raw_data:
-        row_dict = dict(row)
-        row_dict['friendly_name'] = get_friendly_sensor_name(row_dict['sensor_name'])
-        data.append(row_dict)
+    with timed('api.friendly_names'):
+        data = []
+        for row in raw_data:
+            row_dict = dict(row)
+            row_dict['friendly_name'] = get_friendly_sensor_name(row_dict['sensor_name'])
+            data.append(row_dict)
     
     # 获取统计信息
-    cursor.execute('''
-        SELECT 
-            COUNT(*) as total_readings,
-            AVG(temperature) as avg_temp,
-            MAX(temperature) as max_temp,
-            MIN(temperature) as min_temp
-        FROM temperature_readings
-        WHERE timestamp >= datetime('now', 'localtime', '-{} hours')
-    '''.format(hours))
-    
-    stats = dict(cursor.fetchone())
+    with timed('api.query.stats'):
+        stats = storage.stats(start)
     
     # 获取最新温度
-    cursor.execute('''
-        SELECT sensor_name, temperature, timestamp
-        FROM temperature_readings t1
-        WHERE timestamp = (
-            SELECT MAX(timestamp) 
-            FROM temperature_readings t2 
-            WHERE t2.sensor_name = t1.sensor_name
-        )
-        ORDER BY sensor_name
-    ''')
-    
-    raw_current = [dict(row) for row in cursor.fetchall()]
+    with timed('api.query.current'):
+        raw_current = storage.latest()
     
     # 为当前温度也添加友好名称
-    current = []
-    for row in raw_current:
-        row_dict = dict(row)
-        row_dict['friendly_name'] = get_friendly_sensor_name(row_dict['sensor_name'])
-        current.append(row_dict)
-    
-    conn.close()
+    with timed('api.friendly_names'):
+        current = []
+        for row in raw_current:
+            row_dict = dict(row)
+            row_dict['friendly_name'] = get_friendly_sensor_name(row_dict['sensor_name'])
+            current.append(row_dict)
     
     return {
         'data': data,
@@ -452,21 +598,478 @@ def get_temperature_data(hours=24):
         'current': current
     }
 
+def parse_time_param(value):
+    """将请求参数中的时间解析为数据库使用的时间格式"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value).strftime('%Y-%m-%d %H:%M:%S')
+
+def parse_number_param(name, default, cast=float, minimum=None, maximum=None):
+    """解析数值类型的请求参数，无法解析或超出范围时抛出 ValueError"""
+    value = request.args.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        number = cast(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be a finite number")
+    if minimum is not None and number < minimum:
+        raise ValueError(f"{name} must be at least {minimum}")
+    if maximum is not None and number > maximum:
+        raise ValueError(f"{name} must be at most {maximum}")
+    return number
+
+def iter_export_chunks(start=None, end=None, sensors=None, after_id=None):
+    """按 (timestamp, id) 顺序分块读取原始记录
+
+    排序与 idx_timestamp 索引一致，SQLite无需额外排序；after_id 为上次导出的
+    最后一条记录id，用于断点续传。
+    """
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        cursor = conn.cursor()
+        conditions = []
+        params = []
+
+        if after_id is not None:
+            cursor.execute('SELECT timestamp FROM temperature_readings WHERE id = ?', (after_id,))
+            row = cursor.fetchone()
+            if row is None:
+                raise ValueError(f"unknown export cursor: {after_id}")
+            conditions.append('(timestamp, id) > (?, ?)')
+            params.extend([row[0], after_id])
+        if start:
+            conditions.append('timestamp >= ?')
+            params.append(start)
+        if end:
+            conditions.append('timestamp < ?')
+            params.append(end)
+        if sensors:
+            conditions.append('sensor_name IN ({})'.format(','.join('?' * len(sensors))))
+            params.extend(sensors)
+
+        where = 'WHERE ' + ' AND '.join(conditions) if conditions else ''
+        cursor.execute('''
+            SELECT id, timestamp, sensor_name, temperature, unit
+            FROM temperature_readings
+            {}
+            ORDER BY timestamp, id
+        '''.format(where), params)
+
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+def export_csv(chunks):
+    """CSV格式导出"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def export_ndjson(chunks):
+    """NDJSON格式导出，每行一条记录"""
+    for rows in chunks:
+        yield ''.join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + '\n' for row in rows)
+
+class _ArrowSink(io.RawIOBase):
+    """收集Arrow写出的字节，便于按批次流式返回"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def export_arrow(chunks):
+    """Arrow IPC流格式导出（列式），每个数据块对应一个record batch"""
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('timestamp', pa.timestamp('s')),
+        ('sensor_name', pa.string()),
+        ('temperature', pa.float64()),
+        ('unit', pa.string())
+    ])
+    sink = _ArrowSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for rows in chunks:
+            ids, timestamps, names, temps, units = zip(*rows)
+            writer.write_batch(pa.record_batch([
+                pa.array(ids, pa.int64()),
+                pc.strptime(pa.array(timestamps, pa.string()), format='%Y-%m-%d %H:%M:%S', unit='s'),
+                pa.array(names, pa.string()),
+                pa.array(temps, pa.float64()),
+                pa.array(units, pa.string())
+            ], schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+EXPORTERS = {
+    'csv': export_csv,
+    'ndjson': export_ndjson,
+    'arrow': export_arrow
+}
+
+def escape_label_value(value):
+    """按Prometheus文本格式转义标签值"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def render_metrics(snapshot):
+    """将最新温度快照渲染为Prometheus文本格式"""
+    readings = snapshot.get('readings', [])
+    temperature_lines = []
+    threshold_lines = []
+    
+    for reading in readings:
+        labels = 'sensor="{}",friendly_name="{}",category="{}"'.format(
+            escape_label_value(reading['sensor_name']),
+            escape_label_value(get_friendly_sensor_name(reading['sensor_name'])),
+            escape_label_value(reading['category'])
+        )
+        temperature_lines.append(f"temperature_celsius{{{labels}}} {reading['temperature']}")
+        threshold_lines.append(f"temperature_threshold_celsius{{{labels}}} {reading['threshold']}")
+    
+    lines = [
+        '# HELP temperature_celsius Latest sensor temperature in degrees Celsius.',
+        '# TYPE temperature_celsius gauge',
+        *temperature_lines,
+        '# HELP temperature_threshold_celsius Alert threshold for the sensor in degrees Celsius.',
+        '# TYPE temperature_threshold_celsius gauge',
+        *threshold_lines,
+        '# HELP temperature_snapshot_timestamp_seconds Unix time of the latest collection.',
+        '# TYPE temperature_snapshot_timestamp_seconds gauge',
+        f"temperature_snapshot_timestamp_seconds {snapshot.get('timestamp', 0)}"
+    ]
+    return '\n'.join(lines) + '\n'
+
+def load_latest_snapshot():
+    """读取采集器写出的最新温度快照，返回 (mtime, snapshot)
+
+    只对快照文件做一次stat，文件未变化时直接返回缓存。
+    """
+    try:
+        mtime = os.stat(LATEST_SNAPSHOT_FILE).st_mtime_ns
+    except OSError:
+        mtime = None
+    
+    if mtime != _snapshot_cache['mtime']:
+        snapshot = {}
+        if mtime is not None:
+            try:
+                with open(LATEST_SNAPSHOT_FILE, 'r') as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                snapshot = {}
+        _snapshot_cache['snapshot'] = snapshot
+        _snapshot_cache['mtime'] = mtime
+    
+    return _snapshot_cache['mtime'], _snapshot_cache['snapshot']
+
+def get_metrics_body():
+    """返回 /metrics 响应内容，仅在快照变化时重新生成，抓取开销与数据库大小无关"""
+    mtime, snapshot = load_latest_snapshot()
+    # 快照文件尚不存在时 mtime 为 None，以 body 为空判断是否已生成过
+    if _metrics_cache['body'] is None or mtime != _metrics_cache['mtime']:
+        _metrics_cache['body'] = render_metrics(snapshot)
+        _metrics_cache['mtime'] = mtime
+    
+    return _metrics_cache['body']
+
+def snapshot_current_temperatures(snapshot):
+    """将最新快照转换为 /api/temperatures 中 current 的格式，供首页内嵌"""
+    if not snapshot.get('readings'):
+        return []
+    timestamp = format_timestamp(snapshot['timestamp'])
+    return [
+        {
+            'sensor_name': reading['sensor_name'],
+            'friendly_name': get_friendly_sensor_name(reading['sensor_name']),
+            'temperature': reading['temperature'],
+            'timestamp': timestamp
+        }
+        for reading in sorted(snapshot['readings'], key=lambda reading: reading['sensor_name'])
+    ]
+
+def get_index_page():
+    """返回首页 (html, gzip内容, etag)
+
+    页面只在快照变化时重新渲染并压缩一次，每次请求直接返回缓存的字节。
+    """
+    mtime, snapshot = load_latest_snapshot()
+    if _page_cache['page'] is None or mtime != _page_cache['mtime']:
+        html = render_template_string(
+            HTML_TEMPLATE,
+            assets=ASSET_URLS,
+            initial_current=snapshot_current_temperatures(snapshot)
+        ).encode('utf-8')
+        _page_cache['page'] = (html, gzip.compress(html, 9), hashlib.sha256(html).hexdigest()[:16])
+        _page_cache['mtime'] = mtime
+    
+    return _page_cache['page']
+
+def warm_caches():
+    """启动时预先渲染首页，第一个请求无需等待渲染与压缩"""
+    with app.app_context():
+        get_index_page()
+
+def localize_asset_urls(html):
+    """将静态测试页面中的CDN地址替换为本地副本"""
+    for name, path, source_url in VENDOR_ASSETS:
+        html = html.replace(source_url, ASSET_URLS[name])
+    return html
+
+def precompressed_response(body, compressed, mimetype):
+    """客户端支持gzip时直接返回预先压缩的内容"""
+    if 'gzip' in request.accept_encodings:
+        response = Response(compressed, mimetype=mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(body, mimetype=mimetype)
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+def get_storage():
+    """返回当前存储后端
+
+    环形缓冲后端首次使用时从SQLite预热，之后每隔 RING_SYNC_INTERVAL 秒追加SQLite中
+    新写入的行；每个工作进程各自按行id同步，最终都与数据库一致。
+    """
+    with _storage_lock:
+        if _storage['backend'] is None:
+            _storage['backend'] = create_backend(STORAGE_BACKEND, DB_PATH)
+            _storage['synced_at'] = time.monotonic()
+        
+        backend = _storage['backend']
+        if isinstance(backend, RingBufferBackend) and time.monotonic() - _storage['synced_at'] >= RING_SYNC_INTERVAL:
+            backend.sync_from(SQLiteBackend(DB_PATH))
+            _storage['synced_at'] = time.monotonic()
+        
+        return backend
+
+def toggle_profiling():
+    """切换Web服务器采样剖析，同时通过标志文件让采集器对后续采集做cProfile剖析"""
+    output = profiler.toggle()
+    if profiler.running:
+        open(PROFILE_FLAG_FILE, 'w').close()
+        logger.info("Profiling started")
+    else:
+        if os.path.exists(PROFILE_FLAG_FILE):
+            os.remove(PROFILE_FLAG_FILE)
+        logger.info(f"Profiling stopped, samples written to {output}")
+    return output
+
+def handle_profile_signal(signum, frame):
+    toggle_profiling()
+
+def register_signal_handlers():
+    """注册 SIGUSR1 剖析开关；由服务入口在主线程调用，导入本模块不会修改信号处理"""
+    signal.signal(signal.SIGUSR1, handle_profile_signal)
+
+def flush_worker_stats():
+    """将本进程的耗时直方图写入 WEB_STATS_DIR（覆盖写，内存中的直方图本身是累积的）"""
+    if _worker['stats']:
+        write_timings(worker_stats_path(), get_timings())
+
+def _flush_worker_stats_loop():
+    while True:
+        time.sleep(WORKER_STATS_INTERVAL)
+        try:
+            flush_worker_stats()
+        except OSError as e:
+            logger.warning(f"Failed to write worker stats: {e}")
+
+def init_worker(master_pid=None):
+    """多进程部署中工作进程的初始化，在工作进程主线程中调用
+
+    注册剖析信号；剖析标志文件存在时（其他工作进程正在剖析）本进程也开始剖析，
+    使重启或重载出的工作进程与其余进程保持一致；并定期写出耗时直方图。
+    master_pid 为会把 SIGUSR1 转发给所有工作进程的主进程（serve.py），gunicorn 下为 None。
+    """
+    _worker['master_pid'] = master_pid
+    _worker['stats'] = True
+    register_signal_handlers()
+    if os.path.exists(PROFILE_FLAG_FILE) and not profiler.running:
+        profiler.start()
+        logger.info("Profiling started")
+
+    os.makedirs(WEB_STATS_DIR, exist_ok=True)
+    flush_worker_stats()
+    threading.Thread(target=_flush_worker_stats_loop, name='worker-stats', daemon=True).start()
+
+@app.before_request
+def start_request_trace():
+    begin_trace()
+
+@app.after_request
+def log_request_trace(response):
+    timings = end_trace()
+    if timings:
+        logger.info(format_trace('api_request', timings, path=request.path, status=response.status_code))
+    return response
+
 @app.route('/')
 def index():
-    return render_template_string(HTML_TEMPLATE)
+    html, compressed, etag = get_index_page()
+    response = precompressed_response(html, compressed, 'text/html')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    entry = ASSET_FILES.get(filename)
+    if entry is None:
+        return jsonify({'error': 'Not found'}), 404
+    response = precompressed_response(*entry)
+    response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+    return response
 
 @app.route('/test')
 def test():
     with open('test_web.html', 'r') as f:
-        return f.read()
+        return localize_asset_urls(f.read())
+
+@app.route('/bench')
+def bench():
+    with open('bench_web.html', 'r') as f:
+        return localize_asset_urls(f.read())
 
 @app.route('/api/temperatures')
 def api_temperatures():
     hours = int(request.args.get('hours', 24))
-    return jsonify(get_temperature_data(hours))
+    result = get_temperature_data(hours)
+    with timed('api.json'):
+        return jsonify(result)
+
+@app.route('/api/stats')
+def api_stats():
+    """Web服务器与采集器各阶段的耗时直方图"""
+    # 多进程部署时合并其他工作进程写出的直方图，本进程使用内存中的最新数据
+    web = get_timings()
+    if _worker['stats']:
+        web = merge_timings(load_worker_timings(exclude_pid=os.getpid()) + [web])
+    return jsonify({
+        'web': web,
+        'collector': load_timings(COLLECTOR_STATS_FILE),
+        'profiling': profiler.running
+    })
+
+@app.route('/api/profile', methods=['GET', 'POST'])
+def api_profile():
+    """GET 查询剖析状态，POST 切换剖析开关
+
+    serve.py 下改为通知主进程，由主进程把 SIGUSR1 转发给所有工作进程一起切换；
+    切换是异步的，返回切换后的预期状态，各进程的剖析结果分别写入 profiles/。
+    """
+    if request.method == 'POST' and _worker['master_pid']:
+        profiling = not profiler.running
+        os.kill(_worker['master_pid'], signal.SIGUSR1)
+        return jsonify({'profiling': profiling, 'output': None})
+
+    output = None
+    if request.method == 'POST':
+        output = toggle_profiling()
+    return jsonify({'profiling': profiler.running, 'output': output})
+
+@app.route('/metrics')
+def metrics():
+    return Response(get_metrics_body(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/analysis')
+def api_analysis():
+    """跨传感器滞后相关性与过热事件分析
+
+    参数: from/to 或 hours 时间范围, bucket 时间桶秒数, max_lag 最大滞后（时间桶个数）,
+    sensors 逗号分隔的传感器名
+    """
+    try:
+        end = parse_time_param(request.args.get('to')) or datetime.now().strftime(TIMESTAMP_FORMAT)
+        start = parse_time_param(request.args.get('from'))
+        if start is None:
+            hours = parse_number_param('hours', 24, float, 0, ANALYSIS_MAX_HOURS)
+            start = (datetime.strptime(end, TIMESTAMP_FORMAT) - timedelta(hours=hours)).strftime(TIMESTAMP_FORMAT)
+        bucket = parse_number_param('bucket', None, int, 1, ANALYSIS_MAX_HOURS * 3600)
+        # 超过 ANALYSIS_MAX_LAG_LIMIT 或序列长度的滞后由 analyze 截断，实际值见返回的 max_lag
+        max_lag = parse_number_param('max_lag', ANALYSIS_MAX_LAG, int, 0)
+    except (ValueError, OverflowError) as e:
+        return jsonify({'error': str(e)}), 400
+    if start >= end:
+        return jsonify({'error': 'from must be earlier than to'}), 400
+    
+    sensors = [s for s in request.args.get('sensors', '').split(',') if s] or None
+    with timed('api.analysis'):
+        result = analyze(DB_PATH, start, end, bucket, max_lag, sensors)
+    
+    with timed('api.friendly_names'):
+        result['friendly_names'] = {name: get_friendly_sensor_name(name) for name in result['sensors']}
+    
+    with timed('api.json'):
+        return jsonify(result)
+
+@app.route('/api/export')
+def api_export():
+    """批量导出原始数据
+
+    参数: from/to 时间范围, sensors 逗号分隔的传感器名, format 为 csv|ndjson|arrow,
+    after_id 为上次导出最后一条记录的id（断点续传）
+    """
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORTERS:
+        return jsonify({'error': f"unsupported format: {export_format}"}), 400
+    if export_format == 'arrow' and pa is None:
+        return jsonify({'error': 'arrow export requires pyarrow'}), 501
+
+    try:
+        start = parse_time_param(request.args.get('from'))
+        end = parse_time_param(request.args.get('to'))
+        after_id = request.args.get('after_id', type=int)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    sensors = [s for s in request.args.get('sensors', '').split(',') if s] or None
+    chunks = iter_export_chunks(start, end, sensors, after_id)
+
+    # 先取第一个数据块，无效的续传游标返回400而不是中断的流
+    try:
+        first = next(chunks, None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def all_chunks():
+        if first is not None:
+            yield first
+            yield from chunks
+
+    return Response(
+        stream_with_context(EXPORTERS[export_format](all_chunks())),
+        mimetype=EXPORT_MIMETYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename=temperatures.{export_format}'}
+    )
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     print("Starting Temperature Monitor Web Server...")
     print("Open http://localhost:5000 in your browser")
+    register_signal_handlers()
+    warm_caches()
     app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file